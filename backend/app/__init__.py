@@ -1,15 +1,27 @@
+from contextlib import asynccontextmanager
+
 from app.custom_fastapi import CustmFastAPI
 
+@asynccontextmanager
+async def lifespan(app: 'CustmFastAPI'):
+    """Build the service graph once per process and tear it down on shutdown."""
+    from app.services import init_services, close_services
+    from app.dbhandlers import init_handlers, close_handlers
+
+    await init_handlers(app)
+    await init_services(app)
+    try:
+        yield
+    finally:
+        await close_services(app)
+        await close_handlers(app)
+
 def create_app() -> 'CustmFastAPI':
     from app.custom_fastapi import CustmFastAPI
     from app.routes import init_routes
-    from app.services import init_services
-    from app.dbhandlers import init_handlers
     
-    app = CustmFastAPI()
+    app = CustmFastAPI(lifespan=lifespan)
 
-    init_handlers(app)
-    init_services(app)
     init_routes(app)
 
-    return app
\ No newline at end of file
+    return app
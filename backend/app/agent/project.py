@@ -1,122 +1,198 @@
 import json
 from pathlib import Path
-from typing import Dict, Any
-from qdrant_client.http import models 
+import numpy as np
+from typing import AsyncIterator, Dict, Any, Tuple
 
+from app.config import CONTEXT_EXPANSION_WINDOW
 from app.services.embeddings_service import EmbeddingService
+from app.services.rerank_service import RerankService
 from app.external_services.claude_ai_client import ClaudeAIClient
 from app.models.api.agent_router import ProjectResponse
-from app.utils.projects_utils import format_context_texts, extract_source_info
+from app.services.semantic_cache import SemanticCache
+from app.utils.context_assembler import ContextAssembler
+from app.utils.projects_utils import extract_source_info
+from app.utils.stream_utils import ResponseStreamParser
 
 class ProjectAgent:
     """Handles project validation and queries using embeddings and vector DB matching"""
-    def __init__(self):
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        claude_client: ClaudeAIClient,
+        semantic_cache: SemanticCache,
+        rerank_service: RerankService
+    ):
+        self.embedding_service = embedding_service
+        self.claude_client = claude_client
+        self.semantic_cache = semantic_cache
+        self.rerank_service = rerank_service
+        self.context_assembler = ContextAssembler()
         prompt_path = Path(__file__).parent / "prompt" / "project_prompt.json"
         with open(prompt_path) as f:
             self.prompt_config = json.load(f)['project_agent_prompt']
     
     async def process(self, user_message: str) -> Dict[str, Any]:
         try:
-            user_message_embeddings = EmbeddingService.create_embeddings(user_message)
-    
-            query_response = await EmbeddingService.get_embeddings(
-                vector=user_message_embeddings,
-                limit=self.prompt_config['rag_settings'].get('search_depth', 5),
-                threshold=self.prompt_config['rag_settings'].get('relevance_threshold', 0.6)
-            )
-            print(f"Query Response: {query_response}")
-
-            expanded_contexts = []
-            available_sources = set()
-
-            if query_response and isinstance(query_response[0], dict):
-                seen_docs = set()
-
-                for item in query_response:
-                    if 'metadata' not in item:
-                        continue
-                    
-                    doc_id = item['metadata'].get('document_id')
-                    if not doc_id or doc_id in seen_docs:
-                        continue
-                    
-                seen_docs.add(doc_id)
-
-                doc_chunks = await EmbeddingService.get_embeddings(
-                    vector=user_message_embeddings,
-                    limit=20, 
-                    threshold=0.5, 
-                    filter_condition=models.Filter(
-                        must=[
-                            models.FieldCondition(
-                                key="metadata.document_id",
-                                match=models.MatchValue(value=doc_id)
-                            )
-                        ]
-                    )
+            user_message_embeddings = await self.embedding_service.create_embeddings(user_message)
+
+            cached = await self.semantic_cache.lookup(user_message_embeddings)
+            if cached is not None:
+                return cached
+            cache_generation = self.semantic_cache.generation
+
+            formatted_user_message = await self._build_user_message(user_message, user_message_embeddings)
+
+            try:
+                result: ProjectResponse = await self.claude_client.generate(
+                    **self._generation_params(formatted_user_message)
                 )
-                print(f"Doc Chunks: {doc_chunks}")
+                print(f"Result: {result}")
+            except Exception as e:
+                print(f"Failed to validate response: {str(e)}")
+                result = self._unprocessable_response()
+
+            conversation = self._to_conversation(result)
+            if self._is_cacheable(result):
+                await self.semantic_cache.store(user_message_embeddings, conversation, cache_generation)
+            return conversation
+
+        except Exception as e:
+            print(f"Processing error: {str(e)}")
+            return self._fallback_conversation()
+
+    async def process_stream(self, user_message: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Yield bullet events while Claude generates, then a final `done` event."""
+        try:
+            user_message_embeddings = await self.embedding_service.create_embeddings(user_message)
+
+            cached = await self.semantic_cache.lookup(user_message_embeddings)
+            if cached is not None:
+                for index, bullet in enumerate(cached["response"]):
+                    yield "bullet", {"index": index, "text": bullet}
+                yield "done", cached
+                return
+            cache_generation = self.semantic_cache.generation
+
+            formatted_user_message = await self._build_user_message(user_message, user_message_embeddings)
+        except Exception as e:
+            print(f"Processing error: {str(e)}")
+            yield "done", self._fallback_conversation()
+            return
+
+        parser = ResponseStreamParser()
+        try:
+            async for text in self.claude_client.stream(**self._generation_params(formatted_user_message)):
+                for kind, index, bullet in parser.feed(text):
+                    yield kind, {"index": index, "text": bullet}
 
-                for chunk in doc_chunks:
-                    if 'metadata' not in chunk:
-                        continue
-                        
+            result = ClaudeAIClient.parse_content(ProjectResponse, parser.text)
+            print(f"Result: {result}")
+        except Exception as e:
+            print(f"Failed to stream response: {str(e)}")
+            result = self._unprocessable_response()
+            if parser.bullets:
+                result.response = parser.bullets
+
+        conversation = self._to_conversation(result)
+        yield "done", conversation
+        if self._is_cacheable(result):
+            await self.semantic_cache.store(user_message_embeddings, conversation, cache_generation)
+
+    async def _build_user_message(self, user_message: str, user_message_embeddings: np.ndarray) -> str:
+        """Retrieve context for the query and render the prompt template."""
+        query_response = await self.embedding_service.get_embeddings(
+            vector=user_message_embeddings,
+            limit=self.prompt_config['rag_settings'].get('search_depth', 5),
+            threshold=self.prompt_config['rag_settings'].get('relevance_threshold', 0.6),
+            query_text=user_message
+        )
+        print(f"Query Response: {query_response}")
+
+        expanded_contexts = []
+        available_sources = set()
+
+        if query_response and isinstance(query_response[0], dict):
+            chunks = [item for item in query_response if 'metadata' in item]
+            # A hit is one chunk of a large file; the chunks around it are its context.
+            # No score threshold here, so hybrid keyword hits with a weak cosine survive
+            chunks = await self.embedding_service.get_neighbor_chunks(chunks, CONTEXT_EXPANSION_WINDOW)
+
+            chunks = await self.rerank_service.rerank(user_message, chunks)
+
+            for span in self.context_assembler.assemble(chunks):
+                expanded_contexts.append(span['text'])
+
+                for chunk in span['chunks']:
                     chunk = extract_source_info(chunk)
-                    text = chunk['metadata'].get('text', '')
-                    if text:
-                        expanded_contexts.append(text)
-                        
-                    if all(k in chunk['metadata'] for k in ['source_name', 'source_url']):
+                    if all(chunk['metadata'].get(k) for k in ['source_name', 'source_url']):
                         source = {
                             'source_name': chunk['metadata']['source_name'],
                             'source_url': chunk['metadata']['source_url']
                         }
                         available_sources.add(json.dumps(source, sort_keys=True))
 
-            if not expanded_contexts:
-                expanded_contexts = format_context_texts(query_response)
-
-            available_sources = [json.loads(s) for s in available_sources]
-            print(f"Available Sources: {available_sources}")
-            
-            formatted_user_message = self.prompt_config['user_message_template'].format(
-                user_message=user_message,
-                context="\n".join(expanded_contexts),
-                available_sources=json.dumps(available_sources)
-            )
-            print(f"Formatted User Message: {formatted_user_message}")
-            
-            try:
-                result: ProjectResponse = await ClaudeAIClient.generate(
-                    model_class=ProjectResponse,
-                    user_message=formatted_user_message,
-                    system_message=self.prompt_config['base_system_message'],
-                    temperature=self.prompt_config['parameters'].get('temperature', 0.7),
-                    max_tokens=self.prompt_config['parameters'].get('max_tokens', 1500),
-                    top_p=self.prompt_config['parameters'].get('top_p', 0.95)
+        if not expanded_contexts:
+            expanded_contexts = [
+                span['text']
+                for span in self.context_assembler.assemble(
+                    [item for item in query_response if isinstance(item, dict) and 'metadata' in item]
                 )
-                print(f"Result: {result}")
-            except Exception as e:
-                print(f"Failed to validate response: {str(e)}")
-                result = ProjectResponse(
-                    response=["• I couldn't process the response properly"],
-                    is_greeting=False,
-                    exists_in_data=False,
-                    exists_elsewhere=False,
-                    relevant_projects=[],
-                    sources=[]
-                )    
-
-            return {
-                "response": result.response,
-                "relevant_projects": result.relevant_projects,
-                "sources": result.sources
-            }
+            ]
 
-        except Exception as e:
-            print(f"Processing error: {str(e)}")
-            return {
-                "response": self.prompt_config['response_structure']['fallback_response'],
-                "relevant_projects": [],
-                "sources": [] 
-            }
\ No newline at end of file
+        available_sources = [json.loads(s) for s in available_sources]
+        print(f"Available Sources: {available_sources}")
+        
+        formatted_user_message = self.prompt_config['user_message_template'].format(
+            user_message=user_message,
+            context="\n".join(expanded_contexts),
+            available_sources=json.dumps(available_sources)
+        )
+        print(f"Formatted User Message: {formatted_user_message}")
+        
+        return formatted_user_message
+
+    def _generation_params(self, formatted_user_message: str) -> Dict[str, Any]:
+        return {
+            "model_class": ProjectResponse,
+            "user_message": formatted_user_message,
+            "system_message": self.prompt_config['base_system_message'],
+            "temperature": self.prompt_config['parameters'].get('temperature', 0.7),
+            "max_tokens": self.prompt_config['parameters'].get('max_tokens', 1500),
+            "top_p": self.prompt_config['parameters'].get('top_p', 0.95)
+        }
+
+    @staticmethod
+    def _unprocessable_response() -> ProjectResponse:
+        return ProjectResponse(
+            response=["• I couldn't process the response properly"],
+            is_greeting=False,
+            exists_in_data=False,
+            exists_elsewhere=False,
+            relevant_projects=[],
+            sources=[]
+        )
+
+    @staticmethod
+    def _is_cacheable(result: ProjectResponse) -> bool:
+        """Only successful generations are worth replaying to other users."""
+        failed = (
+            ProjectAgent._unprocessable_response().response,
+            ClaudeAIClient.error_response(ProjectResponse).response,
+            ClaudeAIClient.INVALID_FORMAT_RESPONSE
+        )
+        return result.response not in failed
+
+    @staticmethod
+    def _to_conversation(result: ProjectResponse) -> Dict[str, Any]:
+        return {
+            "response": result.response,
+            "relevant_projects": result.relevant_projects,
+            "sources": result.sources
+        }
+
+    def _fallback_conversation(self) -> Dict[str, Any]:
+        return {
+            "response": self.prompt_config['response_structure']['fallback_response'],
+            "relevant_projects": [],
+            "sources": []
+        }
@@ -6,6 +6,93 @@ load_dotenv()
 #QDRANT
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 QDRANT_API_URL = os.getenv("QDRANT_API_URL")
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "4"))
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "10"))
+QDRANT_HEALTHCHECK_INTERVAL = float(os.getenv("QDRANT_HEALTHCHECK_INTERVAL", "30"))
+QDRANT_INDEX_PROFILE = os.getenv("QDRANT_INDEX_PROFILE", "balanced")
+# How often a worker re-reads the collection's index config to pick up a profile
+# applied through another worker
+QDRANT_INDEX_PROFILE_CHECK_INTERVAL = float(os.getenv("QDRANT_INDEX_PROFILE_CHECK_INTERVAL", "30"))
+# "dense" searches vectors only; "hybrid" fuses that with full-text keyword passes by RRF
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Candidates each hybrid pass contributes to the fusion
+RETRIEVAL_PREFETCH_LIMIT = int(os.getenv("RETRIEVAL_PREFETCH_LIMIT", "20"))
+RETRIEVAL_MAX_KEYWORDS = int(os.getenv("RETRIEVAL_MAX_KEYWORDS", "6"))
+
+#EMBEDDINGS
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "32"))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "3600"))
+# Pre-baked model directory; when set the model loads with no Hugging Face hub lookup
+EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH")
+# Load the model after startup instead of before serving; /readyz reports when done
+EMBEDDING_BACKGROUND_PRELOAD = os.getenv("EMBEDDING_BACKGROUND_PRELOAD", "true").lower() == "true"
+# Encoder backend: "torch" (reference FlagModel) or "onnx" (ONNX Runtime)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_PATH = os.getenv("EMBEDDING_ONNX_PATH", "models/bge-small-en-v1.5-onnx")
+EMBEDDING_ONNX_QUANTIZED = os.getenv("EMBEDDING_ONNX_QUANTIZED", "true").lower() == "true"
+# Ingestion encodes in this many worker processes when > 0, instead of threads
+EMBEDDING_WORKER_PROCESSES = int(os.getenv("EMBEDDING_WORKER_PROCESSES", "0"))
+EMBEDDING_WORKER_THREADS = int(os.getenv(
+    "EMBEDDING_WORKER_THREADS",
+    str(max(1, (os.cpu_count() or 1) // max(1, EMBEDDING_WORKER_PROCESSES)))
+))
+
+#RERANK
+# Cross-encoder pass over retrieved chunks before they go into the prompt
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+# "torch" (FlagReranker) or "onnx" (ONNX Runtime)
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "torch")
+RERANK_MODEL_PATH = os.getenv("RERANK_MODEL_PATH")
+RERANK_ONNX_PATH = os.getenv("RERANK_ONNX_PATH", "models/bge-reranker-base-onnx")
+RERANK_ONNX_QUANTIZED = os.getenv("RERANK_ONNX_QUANTIZED", "true").lower() == "true"
+# Chunks scored per request, in retrieval order, and how many of them reach the prompt
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "8"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+# Past this the request keeps retrieval order instead of waiting for scores
+RERANK_TIME_BUDGET_MS = float(os.getenv("RERANK_TIME_BUDGET_MS", "250"))
+
+#CONTEXT
+# Estimated prompt tokens the retrieved context may take
+# Chunks fetched on each side of a matched chunk, from the same source
+CONTEXT_EXPANSION_WINDOW = int(os.getenv("CONTEXT_EXPANSION_WINDOW", "1"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_CHARS_PER_TOKEN = float(os.getenv("CONTEXT_CHARS_PER_TOKEN", "3.5"))
+
+#HTTP
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", "10"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+HTTP_RETRY_MAX_DELAY = float(os.getenv("HTTP_RETRY_MAX_DELAY", "20"))
+
+#INGESTION
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_CONSUMERS = int(os.getenv("INGEST_CONSUMERS", "4"))
+# Batches encoded at once across all ingestion jobs; the rest of the CPU stays with chat
+INGEST_MAX_CONCURRENCY = int(os.getenv("INGEST_MAX_CONCURRENCY", str(max(1, (os.cpu_count() or 2) // 2))))
+QDRANT_UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))
+# Bytes read per step when spooling and chunking uploads
+INGEST_READ_SIZE = int(os.getenv("INGEST_READ_SIZE", str(64 * 1024)))
+# Job records and spooled uploads used to resume interrupted ingestion
+INGEST_STATE_DIR = os.getenv("INGEST_STATE_DIR", "ingest_state")
+
+#SEMANTIC CACHE
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_BACKEND = os.getenv("SEMANTIC_CACHE_BACKEND", "memory")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2048"))
+# How often a worker re-reads the shared generation, i.e. how long other workers'
+# invalidations can take to reach it
+SEMANTIC_CACHE_GENERATION_CHECK_INTERVAL = float(os.getenv("SEMANTIC_CACHE_GENERATION_CHECK_INTERVAL", "5"))
 
 #CLUADE
 CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY")
@@ -13,5 +100,24 @@ CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY")
 FIREBASE_DB_API = os.getenv("FIREBASE_DB_API")
 
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
 #MONGODB
-MONGO_URI = os.getenv("MONGO_URI")
\ No newline at end of file
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_CONNECT_TIMEOUT = float(os.getenv("MONGO_CONNECT_TIMEOUT", "5"))
+MONGO_SERVER_SELECTION_TIMEOUT = float(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT", "5"))
+# Deadline for each DB operation, including waiting for a pooled connection
+MONGO_OPERATION_TIMEOUT = float(os.getenv("MONGO_OPERATION_TIMEOUT", "5"))
+
+#QUOTA
+QUOTA_CACHE_TTL = float(os.getenv("QUOTA_CACHE_TTL", "60"))
+QUOTA_CACHE_MAX_USERS = int(os.getenv("QUOTA_CACHE_MAX_USERS", "10000"))
+
+#WRITE BEHIND
+# Messages and tracking events waiting to be written; enqueueing waits for room beyond this
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "100"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "1"))
+# How long a full buffer may hold up a request before the item is dropped
+WRITE_BEHIND_ENQUEUE_TIMEOUT = float(os.getenv("WRITE_BEHIND_ENQUEUE_TIMEOUT", "0.05"))
@@ -1,7 +1,74 @@
 QDRANT_COLLECTION_NAME = 'project-embeddings'
 
+SEMANTIC_CACHE_COLLECTION_NAME = 'semantic-cache'
+# One-point collection holding the cache generation shared by every worker
+SEMANTIC_CACHE_STATE_COLLECTION_NAME = 'semantic-cache-state'
+
 # TODO - Uncomment it (if you want to test the newly ragged file 1 with improved code)
 # QDRANT_COLLECTION_NAME = 'test-project-embeddings'
 
+# Payload fields given a keyword index for filtering and grouped search
+KEYWORD_PAYLOAD_FIELDS = ["document_id", "source", "source_name", "source_url"]
+# Range-filtered when expanding a matched chunk to its neighbours
+INTEGER_PAYLOAD_FIELDS = ["chunk_number"]
+
+# Bounds of the full-text index on chunk text; query terms outside them can never match
+TEXT_INDEX_MIN_TOKEN_LEN = 2
+TEXT_INDEX_MAX_TOKEN_LEN = 20
+
+# Words too common to be worth a keyword pass in hybrid retrieval
+RETRIEVAL_STOPWORDS = frozenset("""
+a about all an and any are as at be been but by can could did do does for from had has have
+how i if in into is it its me more most my no not of on or our so some such than that the
+their them then there these they this those to up was we were what when where which who
+whom why will with would you your tell show give find list know please
+""".split())
+
+# Named HNSW/quantization layouts for the embeddings collection, cheapest last.
+# m/ef_construct/quantization/on_disk shape the stored index; hnsw_ef,
+# rescore and oversampling only affect search.
+QDRANT_INDEX_PROFILES = {
+    "latency": {
+        "m": 32,
+        "ef_construct": 256,
+        "hnsw_ef": 64,
+        "quantization": "scalar",
+        "on_disk": False,
+        "rescore": True,
+        "oversampling": 1.5
+    },
+    "balanced": {
+        "m": 16,
+        "ef_construct": 100,
+        "hnsw_ef": 128,
+        "quantization": "scalar",
+        "on_disk": True,
+        "rescore": True,
+        "oversampling": 2.0
+    },
+    "memory": {
+        "m": 8,
+        "ef_construct": 100,
+        "hnsw_ef": 128,
+        "quantization": "binary",
+        "on_disk": True,
+        "rescore": True,
+        "oversampling": 3.0
+    }
+}
+
+EMBEDDING_MODEL_NAME = 'BAAI/bge-small-en-v1.5'
+EMBEDDING_MAX_SEQ_LENGTH = 512
+
+RERANK_MODEL_NAME = "BAAI/bge-reranker-base"
+RERANK_MAX_SEQ_LENGTH = 512
+
+# Files written by app.jobs.export_onnx_encoder into EMBEDDING_ONNX_PATH
+ONNX_MODEL_FILE = 'model.onnx'
+ONNX_QUANTIZED_MODEL_FILE = 'model_int8.onnx'
+
 CLAUDE_API_URL = "https://api.anthropic.com/v1/messages"
-CLAUDE_MODEL_NAME = "claude-3-haiku-20240307"
\ No newline at end of file
+CLAUDE_MODEL_NAME = "claude-3-haiku-20240307"
+
+# Messages a signed-in user gets before paying
+FREE_MESSAGE_LIMIT = 5
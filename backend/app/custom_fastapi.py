@@ -1,16 +1,39 @@
+from typing import TYPE_CHECKING, Optional
+import asyncio
+import httpx
 from fastapi import FastAPI
 
+if TYPE_CHECKING:
+    from app.services.embeddings_service import EmbeddingService
+    from app.services.agent_service import AgentService
+    from app.services.projects_service import ProjectsService
+    from app.services.semantic_cache import SemanticCache
+    from app.services.quota_service import QuotaService
+    from app.services.write_behind import WriteBehindBuffer
+    from app.services.rerank_service import RerankService
+    from app.dbhandlers.embeddings_handler import EmbeddingsHandler
+    from app.dbhandlers.job_store import JobStore
+    from app.external_services.db import DB
+    from app.external_services.claude_ai_client import ClaudeAIClient
+    from app.external_services.qdrant_pool import QdrantClientPool
+
 class CustmFastAPI(FastAPI):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        
-        from app.services.embeddings_service import EmbeddingService
-        from app.services.agent_service import AgentService
-        from app.services.projects_service import ProjectsService
-        
-        from app.dbhandlers.embeddings_handler import EmbeddingsHandler
+    """FastAPI app acting as the process-wide service container.
 
-        self.embeddings_service = EmbeddingService()
-        self.agent_service = AgentService()
-        self.projects_service = ProjectsService()
-        self.embeddings_handler = EmbeddingsHandler()
+    The attributes below are populated once by the lifespan hook in
+    `app.create_app` and reached from routes through `get_app`.
+    """
+    qdrant_pool: 'QdrantClientPool'
+    embeddings_handler: 'EmbeddingsHandler'
+    job_store: 'JobStore'
+    http_client: httpx.AsyncClient
+    db: 'DB'
+    embeddings_service: 'EmbeddingService'
+    claude_client: 'ClaudeAIClient'
+    semantic_cache: 'SemanticCache'
+    quota_service: 'QuotaService'
+    rerank_service: 'RerankService'
+    write_behind: 'WriteBehindBuffer'
+    agent_service: 'AgentService'
+    projects_service: 'ProjectsService'
+    warm_up_task: Optional[asyncio.Task]
@@ -1,9 +1,29 @@
 from app.custom_fastapi import CustmFastAPI
-
 from app.dbhandlers.embeddings_handler import EmbeddingsHandler
+from app.dbhandlers.job_store import JobStore
+from app.external_services.db import DB, create_mongo_client
+from app.external_services.http_client import create_http_client
+from app.external_services.qdrant_pool import QdrantClientPool
 
 
-def init_handlers(app: 'CustmFastAPI'):
+async def init_handlers(app: 'CustmFastAPI'):
     """Initialize handlers in the app state."""
-    app.embeddings_handler = EmbeddingsHandler()
-    
\ No newline at end of file
+    app.qdrant_pool = QdrantClientPool()
+    app.embeddings_handler = EmbeddingsHandler(app.qdrant_pool)
+    app.qdrant_pool.start()
+    app.job_store = JobStore()
+
+    app.http_client = create_http_client()
+    app.db = DB(client=create_mongo_client(), http_client=app.http_client)
+    try:
+        await app.db.ensure_indexes()
+    except Exception as e:
+        print(f"Error creating MongoDB indexes: {str(e)}")
+
+
+async def close_handlers(app: 'CustmFastAPI'):
+    """Close the clients owned by the handlers."""
+    await app.qdrant_pool.close()
+    await app.db.close()
+    app.job_store.close()
+    await app.http_client.aclose()
@@ -1,79 +1,265 @@
-import asyncio
-import functools
-from typing import List, Dict, Any, Optional
-from qdrant_client import QdrantClient
+import numpy as np
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
 
-from app.constants import QDRANT_COLLECTION_NAME
-from app.config import QDRANT_API_URL, QDRANT_API_KEY
+from app.config import (
+    QDRANT_INDEX_PROFILE,
+    QDRANT_INDEX_PROFILE_CHECK_INTERVAL,
+    QDRANT_UPSERT_BATCH_SIZE,
+    RETRIEVAL_MODE,
+    RETRIEVAL_PREFETCH_LIMIT,
+    RETRIEVAL_MAX_KEYWORDS
+)
+from app.constants import (
+    QDRANT_COLLECTION_NAME,
+    INTEGER_PAYLOAD_FIELDS,
+    KEYWORD_PAYLOAD_FIELDS,
+    TEXT_INDEX_MIN_TOKEN_LEN,
+    TEXT_INDEX_MAX_TOKEN_LEN
+)
+from app.external_services.qdrant_pool import QdrantClientPool
 from app.models.api.rag_pipeline import DocumentEmbedding
-from app.utils.vector_utils import prepare_point
+from app.utils.vector_utils import (
+    get_index_profile,
+    hnsw_config_for,
+    keyword_terms,
+    pad_vector,
+    prepare_point,
+    profile_for_collection,
+    quantization_config_for,
+    search_params_for
+)
 
 class EmbeddingsHandler:
     """Handles embedding storage and querying in Qdrant vector database."""
 
-    def __init__(self):
-        """Initialize the Qdrant client and ensure collection exists."""
+    def __init__(self, pool: QdrantClientPool):
+        self.pool = pool
+        self.vector_size: Optional[int] = None
+        self.collection_vector_size: Optional[int] = None
+        # flush() is only a barrier when every write lands on the same shard
+        self.single_shard = True
+        self.index_profile = QDRANT_INDEX_PROFILE
+        self.search_params = search_params_for(get_index_profile(self.index_profile))
+        self._profile_checked_at = 0.0
+        self.retrieval_mode = RETRIEVAL_MODE
+
+    @property
+    def client(self) -> AsyncQdrantClient:
+        return self.pool.client()
+
+    @property
+    def ready(self) -> bool:
+        """Whether initialize has reached the collection."""
+        return self.collection_vector_size is not None
+
+    async def initialize(self, vector_size: int):
+        """Ensure the collection exists and record the dimension it stores."""
+        self.vector_size = vector_size
         try:
-            self.client = QdrantClient(
-                url=QDRANT_API_URL, 
-                api_key=QDRANT_API_KEY, 
-                prefer_grpc=True
-            )
-            self._ensure_collection_exists()
+            await self._ensure_collection_exists(vector_size)
+            await self._ensure_payload_indexes()
+            self.collection_vector_size = await self.get_collection_vector_size()
+            await self._refresh_index_profile()
+            shard_number = await self.get_shard_number()
+            self.single_shard = shard_number == 1
+            if not self.single_shard:
+                print(
+                    f"Collection '{QDRANT_COLLECTION_NAME}' has {shard_number} shards; "
+                    f"ingestion upserts wait for each write instead of using a flush barrier"
+                )
+            if self.collection_vector_size != vector_size:
+                print(
+                    f"Collection '{QDRANT_COLLECTION_NAME}' stores {self.collection_vector_size}-d vectors "
+                    f"but the model produces {vector_size}-d; vectors are padded until "
+                    f"app.jobs.migrate_native_dimension is run"
+                )
         except Exception as e:
             print(f"Error initializing EmbeddingsHandler: {str(e)}")
 
-    def _ensure_collection_exists(self, vector_size: int = 1024):
+    async def _ensure_collection_exists(self, vector_size: int):
         """Ensures the Qdrant collection exists, creates it if not."""
         try:
-            if not self.client.collection_exists(collection_name=QDRANT_COLLECTION_NAME):
-                self.client.create_collection(
-                    collection_name=QDRANT_COLLECTION_NAME,
-                    vectors_config=models.VectorParams(
-                        size=vector_size,
-                        distance=models.Distance.COSINE,
-                        on_disk=True 
-                    ),
-                    optimizers_config=models.OptimizersConfigDiff(
-                        indexing_threshold=1000, 
-                        memmap_threshold=20000,
-                        max_optimization_threads=2
-                    ),
-                    hnsw_config=models.HnswConfigDiff(
-                        payload_m=16,
-                        ef_construct=100,
-                        max_indexing_threads=2
-                    ),
-                    wal_config=models.WalConfigDiff(
-                        wal_capacity_mb=512,
-                        wal_segments_ahead=1
-                    )
-                )
-
-                self.client.create_payload_index(
-                    collection_name=QDRANT_COLLECTION_NAME,
-                    field_name="text",
-                    field_schema=models.TextIndexParams(
-                        type="text",
-                        tokenizer="word",
-                        min_token_len=2,
-                        max_token_len=20,
-                        lowercase=True
-                    )
-                )
+            if await self._collection_or_alias_exists(QDRANT_COLLECTION_NAME):
+                return
+            await self.create_collection(QDRANT_COLLECTION_NAME, vector_size)
         except Exception as e:
             print(f"Error ensuring collection exists: {str(e)}")
             raise
 
+    async def _collection_or_alias_exists(self, collection_name: str) -> bool:
+        if await self.client.collection_exists(collection_name=collection_name):
+            return True
+        aliases = await self.client.get_aliases()
+        return any(alias.alias_name == collection_name for alias in aliases.aliases)
+
+    async def _ensure_payload_indexes(self, collection_name: str = QDRANT_COLLECTION_NAME):
+        """Create the indexes used for filtering, grouping and keyword retrieval; idempotent."""
+        for field_name in KEYWORD_PAYLOAD_FIELDS:
+            await self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=models.PayloadSchemaType.KEYWORD
+            )
+        for field_name in INTEGER_PAYLOAD_FIELDS:
+            await self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=models.PayloadSchemaType.INTEGER
+            )
+        await self._create_text_index(collection_name)
+
+    async def _create_text_index(self, collection_name: str):
+        await self.client.create_payload_index(
+            collection_name=collection_name,
+            field_name="text",
+            field_schema=models.TextIndexParams(
+                type="text",
+                tokenizer="word",
+                min_token_len=TEXT_INDEX_MIN_TOKEN_LEN,
+                max_token_len=TEXT_INDEX_MAX_TOKEN_LEN,
+                lowercase=True
+            )
+        )
+
+    async def create_collection(self, collection_name: str, vector_size: int):
+        """Create a collection with the project-embeddings layout."""
+        profile = get_index_profile(self.index_profile)
+        await self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(
+                size=vector_size,
+                distance=models.Distance.COSINE,
+                on_disk=profile["on_disk"]
+            ),
+            optimizers_config=models.OptimizersConfigDiff(
+                indexing_threshold=1000, 
+                memmap_threshold=20000,
+                max_optimization_threads=2
+            ),
+            hnsw_config=hnsw_config_for(profile),
+            quantization_config=quantization_config_for(profile),
+            wal_config=models.WalConfigDiff(
+                wal_capacity_mb=512,
+                wal_segments_ahead=1
+            )
+        )
+
+        await self._ensure_payload_indexes(collection_name)
+
+    async def apply_index_profile(
+        self,
+        name: str,
+        collection_name: str = QDRANT_COLLECTION_NAME
+    ):
+        """Rebuild an existing collection's index with a named profile.
+
+        Qdrant re-indexes in the background; the profile's search params
+        apply to this process immediately and to other processes once they
+        next read the collection config (QDRANT_INDEX_PROFILE_CHECK_INTERVAL).
+        """
+        profile = get_index_profile(name)
+        await self.client.update_collection(
+            collection_name=collection_name,
+            vectors_config={"": models.VectorParamsDiff(on_disk=profile["on_disk"])},
+            hnsw_config=hnsw_config_for(profile),
+            quantization_config=quantization_config_for(profile) or models.Disabled.DISABLED
+        )
+
+        if collection_name == QDRANT_COLLECTION_NAME:
+            self._use_index_profile(name)
+
+    def _use_index_profile(self, name: str):
+        if name != self.index_profile:
+            print(f"Searching with index profile '{name}' (was '{self.index_profile}')")
+        self.index_profile = name
+        self.search_params = search_params_for(get_index_profile(name))
+
+    async def _refresh_index_profile(self):
+        """Follow the profile the collection was last built with, as applied by any process.
+
+        The collection's own HNSW/quantization config is the shared record;
+        a layout matching no profile keeps the current search params.
+        """
+        self._profile_checked_at = time.monotonic()
+        try:
+            info = await self.client.get_collection(collection_name=QDRANT_COLLECTION_NAME)
+        except Exception as e:
+            print(f"Failed to read the index profile: {str(e)}")
+            return
+        name = profile_for_collection(info.config)
+        if name is not None:
+            self._use_index_profile(name)
+
+    async def _maybe_refresh_index_profile(self):
+        if time.monotonic() - self._profile_checked_at >= QDRANT_INDEX_PROFILE_CHECK_INTERVAL:
+            await self._refresh_index_profile()
+
+    async def get_collection_vector_size(
+        self,
+        collection_name: str = QDRANT_COLLECTION_NAME
+    ) -> int:
+        info = await self.client.get_collection(collection_name=collection_name)
+        return info.config.params.vectors.size
+
+    async def get_shard_number(
+        self,
+        collection_name: str = QDRANT_COLLECTION_NAME
+    ) -> int:
+        info = await self.client.get_collection(collection_name=collection_name)
+        return info.config.params.shard_number or 1
+
+    async def _collection_size_changed(self) -> bool:
+        """Re-read the stored dimension after a failed call; True if it changed.
+
+        Catches app.jobs.migrate_native_dimension swapping the collection
+        under a running process, which would otherwise keep padding vectors
+        to the old size until restarted.
+        """
+        try:
+            size = await self.get_collection_vector_size()
+        except Exception:
+            return False
+        if size == self.collection_vector_size:
+            return False
+        print(f"Collection '{QDRANT_COLLECTION_NAME}' now stores {size}-d vectors (was {self.collection_vector_size})")
+        self.collection_vector_size = size
+        return True
+
+    async def _with_size_refresh(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run call, retrying once if it failed because the collection's dimension changed."""
+        try:
+            return await call()
+        except Exception:
+            if not await self._collection_size_changed():
+                raise
+            return await call()
+
+    def _fit_vector(self, vector: Union[List[float], np.ndarray]) -> List[float]:
+        """Pad or trim a vector to the dimension the collection actually stores."""
+        if isinstance(vector, np.ndarray):
+            vector = vector.tolist()
+        if self.collection_vector_size and len(vector) != self.collection_vector_size:
+            return pad_vector(vector, self.collection_vector_size)
+        return vector
+
     async def store_embeddings(
         self, 
-        embeddings: List[DocumentEmbedding]
+        embeddings: List[DocumentEmbedding],
+        wait: bool = True
     ) -> Dict[str, Any]:
+        """Upsert embeddings in bulk; with wait=False Qdrant acknowledges before applying.
+
+        wait=False is ignored on a sharded collection, where flush() cannot
+        order the writes.
+        """
+        wait = wait or not self.single_shard
         if not embeddings:
             return {"status": "success", "stored": 0, "failed": 0, "total": 0}
         
-        batch_size = 100 
+        batch_size = QDRANT_UPSERT_BATCH_SIZE
 
         stats = {
             "stored": 0,
@@ -83,13 +269,14 @@ class EmbeddingsHandler:
 
         for i in range(0, len(embeddings), batch_size):
             batch = embeddings[i:i + batch_size]
-            points = []
+            points, prepared = [], []
 
             point_chunks = [batch[j:j+20] for j in range(0, len(batch), 20)]
 
             for chunk in point_chunks:
                 try:
-                    points.extend([prepare_point(e) for e in chunk])
+                    points.extend([prepare_point(e, self._fit_vector) for e in chunk])
+                    prepared.extend(chunk)
                 except Exception as e:
                     print(f"Point preparation failed: {str(e)}")
                     stats["failed"] += len(chunk)
@@ -99,14 +286,20 @@ class EmbeddingsHandler:
                 continue
             
             try:
-                operation_info = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: self.client.upsert(
+                try:
+                    await self.client.upsert(
                         collection_name=QDRANT_COLLECTION_NAME,
                         points=points,
-                        wait=True
+                        wait=wait
+                    )
+                except Exception:
+                    if not await self._collection_size_changed():
+                        raise
+                    await self.client.upsert(
+                        collection_name=QDRANT_COLLECTION_NAME,
+                        points=[prepare_point(e, self._fit_vector) for e in prepared],
+                        wait=wait
                     )
-                )
 
                 stats["stored"] += len(points)
                 print(f"Stored batch {i // batch_size + 1} with {len(points)} points")
@@ -115,26 +308,118 @@ class EmbeddingsHandler:
                 stats["failed"] += len(points)
        
         return stats
+
+    async def flush(self, embeddings: List[DocumentEmbedding]):
+        """Barrier for earlier wait=False upserts.
+
+        Qdrant applies updates in order within a shard, so on a single-shard
+        collection re-upserting the last batch (ids are deterministic, so
+        this is idempotent) with wait=True returns only once everything
+        queued before it has been applied. Sharded collections get no
+        barrier here because store_embeddings already waited for each write.
+        """
+        if not embeddings or not self.single_shard:
+            return
+        await self.client.upsert(
+            collection_name=QDRANT_COLLECTION_NAME,
+            points=[prepare_point(e, self._fit_vector) for e in embeddings],
+            wait=True
+        )
     
+    async def get_source_hashes(self, source: str) -> Dict[int, Optional[str]]:
+        """Map every point id stored for source to its content hash, without vectors."""
+        hashes = {}
+        offset = None
+        source_filter = models.Filter(
+            must=[models.FieldCondition(key="source", match=models.MatchValue(value=source))]
+        )
+        while True:
+            records, offset = await self.client.scroll(
+                collection_name=QDRANT_COLLECTION_NAME,
+                scroll_filter=source_filter,
+                limit=1000,
+                offset=offset,
+                with_payload=["content_hash"],
+                with_vectors=False
+            )
+            for record in records:
+                hashes[record.id] = (record.payload or {}).get("content_hash")
+            if offset is None:
+                return hashes
+
+    async def set_positions(self, positions: Dict[int, Tuple[Optional[int], Optional[int]]]):
+        """Refresh start_pos/end_pos of stored chunks whose text only moved within the source."""
+        operations = [
+            models.SetPayloadOperation(
+                set_payload=models.SetPayload(
+                    payload={"start_pos": start_pos, "end_pos": end_pos},
+                    points=[point_id]
+                )
+            )
+            for point_id, (start_pos, end_pos) in positions.items()
+        ]
+        if operations:
+            await self.client.batch_update_points(
+                collection_name=QDRANT_COLLECTION_NAME,
+                update_operations=operations,
+                wait=False
+            )
+
+    async def retrieve_vectors(self, ids: List[int]) -> Dict[int, List[float]]:
+        if not ids:
+            return {}
+        records = await self.client.retrieve(
+            collection_name=QDRANT_COLLECTION_NAME,
+            ids=ids,
+            with_payload=False,
+            with_vectors=True
+        )
+        return {record.id: record.vector for record in records if record.vector}
+
+    async def delete_points(self, ids: List[int]) -> int:
+        for i in range(0, len(ids), QDRANT_UPSERT_BATCH_SIZE):
+            await self.client.delete(
+                collection_name=QDRANT_COLLECTION_NAME,
+                points_selector=models.PointIdsList(points=ids[i:i + QDRANT_UPSERT_BATCH_SIZE]),
+                wait=True
+            )
+        return len(ids)
+
     async def query_embeddings(
         self,
-        vector: List[float],
+        vector: np.ndarray,
         top_k: int = 10,
         includes_values: bool = False,
         filter_condition: Optional[models.Filter] = None,
-        score_threshold: Optional[float] = None
+        score_threshold: Optional[float] = None,
+        query_text: Optional[str] = None
     ) -> List[Dict]:
+        """Dense search, or hybrid search when query_text is given and RETRIEVAL_MODE is "hybrid".
+
+        Each result's score_type says what its score is: "cosine" similarity
+        for dense search, or an RRF fusion score for hybrid search, which
+        only orders results and is not comparable to a cosine threshold.
+        In hybrid mode score_threshold filters the dense pass only, so
+        keyword matches are returned whatever their cosine score.
+        """
         try:
-            if not vector:
+            if vector is None or len(vector) == 0:
                 print("Error: Empty query vector")
                 return []
+
+            await self._maybe_refresh_index_profile()
+            terms = keyword_terms(query_text, RETRIEVAL_MAX_KEYWORDS) if query_text else []
+            if self.retrieval_mode == "hybrid" and terms:
+                return await self._with_size_refresh(lambda: self._query_hybrid(
+                    vector, terms, top_k, includes_values, filter_condition, score_threshold
+                ))
             
             query_params = {
                 "collection_name": QDRANT_COLLECTION_NAME,
-                "query_vector": vector,
                 "limit": top_k,
                 "with_payload": True,
-                "with_vectors": includes_values
+                "with_vectors": includes_values,
+                "search_params": self.search_params
             }
             
             if filter_condition:
@@ -143,24 +428,146 @@ class EmbeddingsHandler:
             if score_threshold is not None:
                 query_params["score_threshold"] = score_threshold
 
-            if hasattr(self.client, 'search_async'):
-                search_results = await self.client.search_async(**query_params)
-            else:
-                search_results = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: self.client.search(**query_params)
-                )
+            search_results = (await self._with_size_refresh(
+                lambda: self.client.query_points(query=self._fit_vector(vector), **query_params)
+            )).points
 
-            return [
-                {
-                    "id": str(match.id),
-                    "values": match.vector if includes_values else [],
-                    "metadata": match.payload or {},
-                    "score": match.score
-                }
-                for match in search_results
-            ]
+            return [self._to_result(match, includes_values) for match in search_results]
         
         except Exception as e:
             print(f"Query error: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+
+    async def _query_hybrid(
+        self,
+        vector: np.ndarray,
+        terms: List[str],
+        top_k: int,
+        includes_values: bool,
+        filter_condition: Optional[models.Filter],
+        score_threshold: Optional[float]
+    ) -> List[Dict]:
+        """Fuse a dense pass with one keyword pass per term by reciprocal rank fusion.
+
+        Each keyword pass ranks, by vector similarity, only the chunks whose
+        text contains that term. A rare term such as a project name puts its
+        chunks at the top of its own pass, so they survive fusion even when
+        their cosine score alone would miss the dense cut. Everything runs
+        in one query_points call. The threshold applies to the dense pass
+        only, and the scores returned are RRF scores.
+        """
+        query_vector = self._fit_vector(vector)
+        limit = max(RETRIEVAL_PREFETCH_LIMIT, top_k)
+        base_conditions = [filter_condition] if filter_condition else []
+
+        prefetch = [
+            models.Prefetch(
+                query=query_vector,
+                filter=filter_condition,
+                params=self.search_params,
+                score_threshold=score_threshold,
+                limit=limit
+            )
+        ]
+        for term in terms:
+            prefetch.append(
+                models.Prefetch(
+                    query=query_vector,
+                    filter=models.Filter(
+                        must=base_conditions + [
+                            models.FieldCondition(key="text", match=models.MatchText(text=term))
+                        ]
+                    ),
+                    params=self.search_params,
+                    limit=limit
+                )
+            )
+
+        search_results = (await self.client.query_points(
+            collection_name=QDRANT_COLLECTION_NAME,
+            prefetch=prefetch,
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            limit=top_k,
+            with_payload=True,
+            with_vectors=includes_values
+        )).points
+
+        return [self._to_result(match, includes_values, score_type="rrf") for match in search_results]
+
+    async def get_neighbor_chunks(self, hits: List[Dict], window: int) -> List[Dict]:
+        """hits, each followed by the chunks within window positions of it in its source.
+
+        One scroll covers every hit. A hit's neighbours are ordered by
+        chunk_number and carry its score, so ranking keeps them beside it.
+        Hits without a source or chunk_number are kept as they are.
+        """
+        anchors = [
+            (hit["metadata"].get("source"), hit["metadata"].get("chunk_number"))
+            for hit in hits
+        ]
+        conditions = [
+            models.Filter(
+                must=[
+                    models.FieldCondition(key="source", match=models.MatchValue(value=source)),
+                    models.FieldCondition(
+                        key="chunk_number",
+                        range=models.Range(gte=chunk_number - window, lte=chunk_number + window)
+                    )
+                ]
+            )
+            for source, chunk_number in anchors
+            if source and chunk_number is not None
+        ]
+        if window <= 0 or not conditions:
+            return hits
+
+        try:
+            records, _ = await self.client.scroll(
+                collection_name=QDRANT_COLLECTION_NAME,
+                scroll_filter=models.Filter(should=conditions),
+                limit=len(conditions) * (2 * window + 1),
+                with_payload=True,
+                with_vectors=False
+            )
+        except Exception as e:
+            print(f"Neighbor chunk query error: {str(e)}")
+            return hits
+
+        by_position = {
+            (record.payload.get("source"), record.payload.get("chunk_number")): record
+            for record in records
+            if record.payload
+        }
+        expanded, seen = [], set()
+        for hit, (source, chunk_number) in zip(hits, anchors):
+            if not source or chunk_number is None:
+                neighbors = [hit]
+            else:
+                neighbors = []
+                for position in range(chunk_number - window, chunk_number + window + 1):
+                    record = by_position.get((source, position))
+                    if position == chunk_number:
+                        neighbors.append(hit)
+                    elif record is not None:
+                        neighbors.append({
+                            "id": str(record.id),
+                            "values": [],
+                            "metadata": record.payload,
+                            "score": hit.get("score"),
+                            "score_type": hit.get("score_type")
+                        })
+            for chunk in neighbors:
+                if chunk["id"] not in seen:
+                    seen.add(chunk["id"])
+                    expanded.append(chunk)
+        return expanded
+
+    @staticmethod
+    def _to_result(match, includes_values: bool = False, score_type: str = "cosine") -> Dict:
+        return {
+            "id": str(match.id),
+            "values": match.vector if includes_values else [],
+            "metadata": match.payload or {},
+            "score": match.score,
+            "score_type": score_type
+        }
\ No newline at end of file
@@ -0,0 +1,102 @@
+import json
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+from app.config import INGEST_STATE_DIR
+
+class JobStore:
+    """Local SQLite record of ingestion jobs plus a spool of their uploads.
+
+    Kept on local disk so a restarted pod can find interrupted jobs and
+    re-read the upload they were working on.
+    """
+
+    RESUMABLE_STATUSES = ("pending", "running", "interrupted")
+
+    def __init__(self, state_dir: str = INGEST_STATE_DIR):
+        self.state_dir = state_dir
+        self.spool_dir = os.path.join(state_dir, "uploads")
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(state_dir, "jobs.db"), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                source TEXT,
+                custom_metadata TEXT,
+                total_chunks INTEGER,
+                watermark INTEGER NOT NULL DEFAULT 0,
+                resumed_from INTEGER NOT NULL DEFAULT 0,
+                incremental INTEGER NOT NULL DEFAULT 0,
+                stats TEXT,
+                error TEXT,
+                started_at REAL,
+                updated_at REAL
+            )
+            """
+        )
+        self._add_missing_columns()
+        self.conn.commit()
+
+    # Columns added after the table was first shipped; CREATE TABLE IF NOT
+    # EXISTS leaves an existing jobs.db without them
+    ADDED_COLUMNS = {
+        "incremental": "INTEGER NOT NULL DEFAULT 0"
+    }
+
+    def _add_missing_columns(self):
+        existing = {row["name"] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        for name, definition in self.ADDED_COLUMNS.items():
+            if name not in existing:
+                print(f"Adding column '{name}' to the jobs table")
+                self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+
+    def spool_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{job_id}.txt")
+
+    def remove_spool(self, job_id: str):
+        try:
+            os.remove(self.spool_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def save(self, record: Dict[str, Any]):
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO jobs
+                (id, status, source, custom_metadata, total_chunks, watermark, resumed_from, incremental, stats, error, started_at, updated_at)
+            VALUES
+                (:id, :status, :source, :custom_metadata, :total_chunks, :watermark, :resumed_from, :incremental, :stats, :error, :started_at, :updated_at)
+            """,
+            {
+                **record,
+                "custom_metadata": json.dumps(record.get("custom_metadata")),
+                "stats": json.dumps(record.get("stats"))
+            }
+        )
+        self.conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def resumable(self) -> List[Dict[str, Any]]:
+        placeholders = ", ".join("?" for _ in self.RESUMABLE_STATUSES)
+        rows = self.conn.execute(
+            f"SELECT * FROM jobs WHERE status IN ({placeholders}) ORDER BY started_at",
+            self.RESUMABLE_STATUSES
+        ).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record["custom_metadata"] = json.loads(record["custom_metadata"] or "null")
+        record["stats"] = json.loads(record["stats"] or "null") or {}
+        return record
+
+    def close(self):
+        self.conn.close()
@@ -1,19 +1,26 @@
 import json
 import httpx
 import regex
-from typing import TypeVar, Type, Optional
+from typing import AsyncIterator, TypeVar, Type, Optional, Dict, Any
 from pydantic import BaseModel
 
 from app.config import CLAUDE_API_KEY
 from app.constants import CLAUDE_API_URL, CLAUDE_MODEL_NAME
+from app.external_services.http_client import send_with_retry
 
 T = TypeVar('T', bound=BaseModel)
 
 class ClaudeAIClient:
     """Client for generating structured responses using Pydantic models"""
-    
-    @staticmethod
+
+    # Stands in for a completion whose `response` was not a list
+    INVALID_FORMAT_RESPONSE = ["• Invalid response format received"]
+
+    def __init__(self, http_client: httpx.AsyncClient):
+        self.http_client = http_client
+
     async def generate(
+        self,
         model_class: Type[T],
         user_message: str,
         system_message: Optional[str] = None,
@@ -22,69 +29,140 @@ class ClaudeAIClient:
         max_tokens: int = 1000
     ) -> T:
         try:
-            headers = {
-                "x-api-key": CLAUDE_API_KEY,
-                "anthropic-version": "2023-06-01",
-                "Content-Type": "application/json"
-            }
-
-            enhanced_message = (
-                f"{user_message}\n\n"
-                f"IMPORTANT: Respond with valid JSON that matches this schema:\n"
-                f"{model_class.model_json_schema()}\n"
-                f"Your entire response must be valid JSON only, no other text."
+            payload = ClaudeAIClient._build_payload(
+                model_class, user_message, system_message, temperature, top_p, max_tokens
+            )
+
+            response = await send_with_retry(
+                self.http_client,
+                "POST",
+                CLAUDE_API_URL,
+                headers=ClaudeAIClient._headers(),
+                json=payload
             )
 
-            payload = {
-                "model": CLAUDE_MODEL_NAME,
-                "system": system_message,
-                "messages": [{"role": "user", "content": enhanced_message}],
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "top_p": top_p
-            }
-        
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    CLAUDE_API_URL,
-                    headers=headers,
-                    json=payload,
-                    timeout=30.0
-                )
+            response.raise_for_status()
+            json_response = response.json()
+
+            content = json_response.get("content", [{}])[0].get("text", "")
+
+            return ClaudeAIClient.parse_content(model_class, content)
 
-                response.raise_for_status()
-                json_response = response.json()
-                
-                content = json_response.get("content", [{}])[0].get("text", "")
-                
-                try:
-                    json_content = json.loads(content)
-                except json.JSONDecodeError:
-                    json_content = json.loads(ClaudeAIClient._extract_json(content))
-
-                if not isinstance(json_content.get('response'), list):
-                    json_content['response'] = ["• Invalid response format received"]
-                json_content.setdefault('is_greeting', False)
-                json_content.setdefault('exists_in_data', False)
-                json_content.setdefault('exists_elsewhere', False)
-                json_content.setdefault('relevant_projects', [])
-                json_content.setdefault('sources', [])
-                
-                return model_class.model_validate(json_content)
-                
         except httpx.HTTPStatusError as e:
             print(f"API error: {e.response.text}")
             raise ValueError(f"API request failed: {str(e)}")
         except Exception as e:
             print(f"Unexpected error: {str(e)}")
-            return model_class(
-                response=["• Error processing your request"],
-                is_greeting=False,
-                exists_in_data=False,
-                exists_elsewhere=False,
-                relevant_projects=[],
-                sources=[]
-            )
+            return ClaudeAIClient.error_response(model_class)
+
+    async def stream(
+        self,
+        model_class: Type[T],
+        user_message: str,
+        system_message: Optional[str] = None,
+        temperature: float = 0.3,
+        top_p: float = 1.0,
+        max_tokens: int = 1000
+    ) -> AsyncIterator[str]:
+        """Yield text deltas as Claude generates them (`stream: true`)."""
+        payload = ClaudeAIClient._build_payload(
+            model_class, user_message, system_message, temperature, top_p, max_tokens
+        )
+        payload["stream"] = True
+
+        response = await send_with_retry(
+            self.http_client,
+            "POST",
+            CLAUDE_API_URL,
+            stream=True,
+            headers=ClaudeAIClient._headers(),
+            json=payload
+        )
+        try:
+            if response.is_error:
+                await response.aread()
+                print(f"API error: {response.text}")
+                response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+
+                event = json.loads(line[5:].strip())
+                event_type = event.get("type")
+
+                if event_type == "content_block_delta":
+                    text = event.get("delta", {}).get("text")
+                    if text:
+                        yield text
+                elif event_type == "error":
+                    raise ValueError(f"Stream error: {event.get('error')}")
+                elif event_type == "message_stop":
+                    break
+        finally:
+            await response.aclose()
+
+    @staticmethod
+    def parse_content(model_class: Type[T], content: str) -> T:
+        """Parse a completion into model_class, filling defaults for missing fields"""
+        try:
+            json_content = json.loads(content)
+        except json.JSONDecodeError:
+            json_content = json.loads(ClaudeAIClient._extract_json(content))
+
+        if not isinstance(json_content.get('response'), list):
+            json_content['response'] = list(ClaudeAIClient.INVALID_FORMAT_RESPONSE)
+        json_content.setdefault('is_greeting', False)
+        json_content.setdefault('exists_in_data', False)
+        json_content.setdefault('exists_elsewhere', False)
+        json_content.setdefault('relevant_projects', [])
+        json_content.setdefault('sources', [])
+
+        return model_class.model_validate(json_content)
+
+    @staticmethod
+    def error_response(model_class: Type[T]) -> T:
+        return model_class(
+            response=["• Error processing your request"],
+            is_greeting=False,
+            exists_in_data=False,
+            exists_elsewhere=False,
+            relevant_projects=[],
+            sources=[]
+        )
+
+    @staticmethod
+    def _headers() -> Dict[str, str]:
+        return {
+            "x-api-key": CLAUDE_API_KEY,
+            "anthropic-version": "2023-06-01",
+            "Content-Type": "application/json"
+        }
+
+    @staticmethod
+    def _build_payload(
+        model_class: Type[T],
+        user_message: str,
+        system_message: Optional[str],
+        temperature: float,
+        top_p: float,
+        max_tokens: int
+    ) -> Dict[str, Any]:
+        enhanced_message = (
+            f"{user_message}\n\n"
+            f"IMPORTANT: Respond with valid JSON that matches this schema:\n"
+            f"{model_class.model_json_schema()}\n"
+            f"Your entire response must be valid JSON only, no other text."
+        )
+
+        return {
+            "model": CLAUDE_MODEL_NAME,
+            "system": system_message,
+            "messages": [{"role": "user", "content": enhanced_message}],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "top_p": top_p
+        }
 
     @staticmethod
     def _extract_json(text: str) -> str:
@@ -95,8 +173,8 @@ class ClaudeAIClient:
             text = text[3:]
         if text.endswith("```"):
             text = text[:-3]
-        
+
         json_match = regex.search(r'\{(?:[^{}]|(?R))*\}', text, regex.DOTALL)
         if not json_match:
             raise ValueError("No valid JSON found in response")
-        return json_match.group(0)
\ No newline at end of file
+        return json_match.group(0)
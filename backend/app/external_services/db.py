@@ -1,14 +1,42 @@
 import httpx
 import json
-from pymongo import MongoClient
+import uuid
+import pymongo
+from pymongo import AsyncMongoClient, ReturnDocument
 from datetime import datetime, UTC
+from typing import Any, Dict, List, Optional
 
 from app.models.db.user import User
 from app.models.db.message import Message
-from app.config import FIREBASE_DB_API
+from app.config import (
+    FIREBASE_DB_API,
+    MONGO_URI,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_CONNECT_TIMEOUT,
+    MONGO_SERVER_SELECTION_TIMEOUT,
+    MONGO_OPERATION_TIMEOUT
+)
+from app.external_services.http_client import send_with_retry
+
+def create_mongo_client() -> AsyncMongoClient:
+    """Async client with a bounded connection pool; connects lazily on first use."""
+    return AsyncMongoClient(
+        MONGO_URI,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        connectTimeoutMS=int(MONGO_CONNECT_TIMEOUT * 1000),
+        serverSelectionTimeoutMS=int(MONGO_SERVER_SELECTION_TIMEOUT * 1000)
+    )
 
 class DB:
-    def __init__(self,  client: MongoClient):
+    """User and message storage on the event loop.
+
+    Every operation runs under a MONGO_OPERATION_TIMEOUT deadline, so a slow
+    Mongo round trip fails that request instead of holding it indefinitely.
+    """
+
+    def __init__(self,  client: AsyncMongoClient, http_client: httpx.AsyncClient):
         try:
             self.client = client
             self.db = self.client.get_default_database()
@@ -21,47 +49,76 @@ class DB:
             self.db = None
             self.users_collection = None
             self.messages_collection = None
+        self.http_client = http_client
         self.headers = {
             'Content-Type': 'application/json',
         }
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+
+    @staticmethod
+    def _timeout():
+        return pymongo.timeout(MONGO_OPERATION_TIMEOUT)
+
+    async def ensure_indexes(self):
+        """Create the indexes lookups rely on; a no-op when they exist."""
+        if self.db is None:
+            return
+        await self.users_collection.create_index("user_id")
+        await self.messages_collection.create_index("user_id")
     
+    @staticmethod
+    def tracking_key() -> str:
+        """Firebase key for one tracked message; the suffix keeps same-second writes apart."""
+        return f"{datetime.now(UTC).strftime('%d-%b-%Y-%H-%M-%S')}-{uuid.uuid4().hex[:8]}"
+
     async def track_message(self, response):
-        json_str = json.dumps(response, default=str)
-        timestamp = datetime.now(UTC).strftime("%d-%b-%Y-%H-%M-%S")
-        url = f"{FIREBASE_DB_API}/solstrom/{timestamp}.json"
-        async with httpx.AsyncClient() as client:
-            response = await client.put(url, headers=self.headers, json=json_str)
+        return await self.track_messages({self.tracking_key(): response})
+
+    async def track_messages(self, responses: Dict[str, Any]):
+        """Write many tracked messages, keyed by tracking_key(), in one multi-path update."""
+        if not responses:
+            return None
+        body = {key: json.dumps(response, default=str) for key, response in responses.items()}
+        url = f"{FIREBASE_DB_API}/solstrom.json"
+        response = await send_with_retry(self.http_client, "PATCH", url, headers=self.headers, json=body)
         return {"status": response.status_code, "data": response.json()}
 
-    def get_user(self, user_id: str):
+    async def get_user(self, user_id: str):
         if self.users_collection is None:
             return None
-        return self.users_collection.find_one({"user_id": user_id})
+        with self._timeout():
+            return await self.users_collection.find_one({"user_id": user_id})
 
-    def get_user_by_email(self, email: str):
+    async def get_user_by_email(self, email: str):
         if self.users_collection is None:
             return None
-        return self.users_collection.find_one({"email": email})
+        with self._timeout():
+            return await self.users_collection.find_one({"email": email})
 
-    def create_user(self, user_id: str, email: str, name: str):
+    async def create_user(self, user_id: str, email: str, name: str):
         if self.users_collection is None:
             return None
         user_data = User(user_id=user_id, email=email, name=name)
-        self.users_collection.insert_one(user_data.model_dump())
+        with self._timeout():
+            await self.users_collection.insert_one(user_data.model_dump())
         return user_data.model_dump()
 
-    def update_user_paid(self, user_id: str):
+    async def update_user_paid(self, user_id: str):
         if self.users_collection is None:
             return
-        self.users_collection.update_one(
-            {"user_id": user_id},
-            {"$set": {"paid": True, "free": False}}
-        )
+        with self._timeout():
+            await self.users_collection.update_one(
+                {"user_id": user_id},
+                {"$set": {"paid": True, "free": False}}
+            )
 
-    def set_user_paid(self, user_id: str):
-        self.update_user_paid(user_id)
+    async def set_user_paid(self, user_id: str):
+        await self.update_user_paid(user_id)
 
-    def store_message(self, user_id: str, user_message: str, agent_message: str):
+    async def store_message(self, user_id: str, user_message: str, agent_message: str):
         if self.messages_collection is None:
             return None
         message_data = Message(
@@ -69,12 +126,61 @@ class DB:
             user_message=user_message,
             agent_message=agent_message
         )
-        self.messages_collection.insert_one(message_data.model_dump())
+        with self._timeout():
+            await self.messages_collection.insert_one(message_data.model_dump())
         return message_data.model_dump()
 
-    def count_user_messages(self, user_id: str):
+    async def store_messages(self, messages: List[Dict[str, Any]]):
+        """Insert many Message documents in one round trip."""
+        if self.messages_collection is None or not messages:
+            return
+        with self._timeout():
+            await self.messages_collection.insert_many(messages, ordered=False)
+
+    async def count_user_messages(self, user_id: str):
         if self.messages_collection is None:
             return 0
-        count = self.messages_collection.count_documents({"user_id": user_id})
+        with self._timeout():
+            count = await self.messages_collection.count_documents({"user_id": user_id})
         print(f"DEBUG: Counting messages for user_id '{user_id}'. Found: {count} messages.")
-        return count
\ No newline at end of file
+        return count
+
+    async def increment_message_count(self, user_id: str) -> Optional[int]:
+        """Atomically bump the user's message counter and return the new value.
+
+        Returns None when the user has no counter yet, instead of letting
+        $inc start it at 1 and lose the messages stored before it existed.
+        """
+        if self.users_collection is None:
+            return 0
+        with self._timeout():
+            user = await self.users_collection.find_one_and_update(
+                {"user_id": user_id, "message_count": {"$exists": True}},
+                {"$inc": {"message_count": 1}},
+                projection={"message_count": True},
+                return_document=ReturnDocument.AFTER
+            )
+        return user.get("message_count", 0) if user else None
+
+    async def init_message_count(self, user_id: str) -> int:
+        """Seed message_count from the messages collection for users created before it existed.
+
+        Only reached before a user's first counted message, so none of their
+        messages can still be waiting in a write-behind buffer: every
+        buffered message is counted with increment_message_count, which
+        needs the seeded counter.
+        """
+        count = await self.count_user_messages(user_id)
+        if self.users_collection is None:
+            return count
+        with self._timeout():
+            user = await self.users_collection.find_one_and_update(
+                {"user_id": user_id, "message_count": {"$exists": False}},
+                {"$set": {"message_count": count}},
+                projection={"message_count": True},
+                return_document=ReturnDocument.AFTER
+            )
+        if user is None:
+            # Someone else seeded it first; theirs may already include new messages
+            user = await self.get_user(user_id)
+        return user.get("message_count", count) if user else count
@@ -0,0 +1,89 @@
+import asyncio
+import random
+import httpx
+from datetime import datetime, UTC
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from app.config import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_WRITE_TIMEOUT,
+    HTTP_POOL_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_RETRY_BACKOFF,
+    HTTP_RETRY_MAX_DELAY
+)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+
+def create_http_client() -> httpx.AsyncClient:
+    """Shared HTTP/2 client reused for every outbound call."""
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(
+            connect=HTTP_CONNECT_TIMEOUT,
+            read=HTTP_READ_TIMEOUT,
+            write=HTTP_WRITE_TIMEOUT,
+            pool=HTTP_POOL_TIMEOUT
+        )
+    )
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, in either seconds or HTTP-date form."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(UTC)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(HTTP_RETRY_MAX_DELAY, HTTP_RETRY_BACKOFF * (2 ** attempt)))
+
+async def send_with_retry(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    stream: bool = False,
+    max_retries: int = HTTP_MAX_RETRIES,
+    **kwargs
+) -> httpx.Response:
+    """Send a request, retrying connection failures, 429 and 5xx responses.
+
+    With stream=True the body is left unread and the caller must close the
+    response.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            response = await client.send(client.build_request(method, url, **kwargs), stream=stream)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+            if attempt == max_retries:
+                raise
+            delay = _backoff_delay(attempt)
+            print(f"{method} {url} failed to connect ({str(e)}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            continue
+
+        if response.status_code not in RETRY_STATUS_CODES or attempt == max_retries:
+            return response
+
+        retry_after = _retry_after(response)
+        delay = min(HTTP_RETRY_MAX_DELAY, retry_after) if retry_after is not None else _backoff_delay(attempt)
+        await response.aclose()
+        print(f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
@@ -0,0 +1,94 @@
+import asyncio
+import itertools
+from typing import List, Optional
+from qdrant_client import AsyncQdrantClient
+
+from app.config import (
+    QDRANT_API_URL,
+    QDRANT_API_KEY,
+    QDRANT_POOL_SIZE,
+    QDRANT_TIMEOUT,
+    QDRANT_HEALTHCHECK_INTERVAL
+)
+
+class QdrantClientPool:
+    """Long-lived pool of async Qdrant clients shared by every request."""
+
+    def __init__(
+        self,
+        size: int = QDRANT_POOL_SIZE,
+        healthcheck_interval: float = QDRANT_HEALTHCHECK_INTERVAL
+    ):
+        self.size = max(1, size)
+        self.healthcheck_interval = healthcheck_interval
+        self._clients: List[AsyncQdrantClient] = [self._create_client() for _ in range(self.size)]
+        self._healthy = [True] * self.size
+        self._cursor = itertools.count()
+        self._healthcheck_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _create_client() -> AsyncQdrantClient:
+        return AsyncQdrantClient(
+            url=QDRANT_API_URL,
+            api_key=QDRANT_API_KEY,
+            prefer_grpc=True,
+            timeout=QDRANT_TIMEOUT
+        )
+
+    def client(self) -> AsyncQdrantClient:
+        """Return the next healthy client in round-robin order."""
+        for _ in range(self.size):
+            index = next(self._cursor) % self.size
+            if self._healthy[index]:
+                return self._clients[index]
+        # Nothing passed the last check; let the caller's request surface the error
+        return self._clients[next(self._cursor) % self.size]
+
+    def start(self):
+        """Start the periodic health check."""
+        if self.healthcheck_interval > 0 and self._healthcheck_task is None:
+            self._healthcheck_task = asyncio.create_task(self._healthcheck_loop())
+
+    async def check_health(self) -> bool:
+        """Ping every client, replacing the ones that fail."""
+        for index, client in enumerate(self._clients):
+            try:
+                await asyncio.wait_for(client.get_collections(), timeout=QDRANT_TIMEOUT)
+                self._healthy[index] = True
+            except Exception as e:
+                print(f"Qdrant client {index} failed health check: {str(e)}")
+                self._healthy[index] = False
+                await self._replace_client(index)
+        return any(self._healthy)
+
+    async def _replace_client(self, index: int):
+        old_client = self._clients[index]
+        self._clients[index] = self._create_client()
+        try:
+            await old_client.close()
+        except Exception as e:
+            print(f"Error closing Qdrant client {index}: {str(e)}")
+
+    async def _healthcheck_loop(self):
+        while True:
+            await asyncio.sleep(self.healthcheck_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                print(f"Qdrant health check error: {str(e)}")
+
+    async def close(self):
+        """Stop the health check and close every client."""
+        if self._healthcheck_task is not None:
+            self._healthcheck_task.cancel()
+            try:
+                await self._healthcheck_task
+            except asyncio.CancelledError:
+                pass
+            self._healthcheck_task = None
+
+        for client in self._clients:
+            try:
+                await client.close()
+            except Exception as e:
+                print(f"Error closing Qdrant client: {str(e)}")
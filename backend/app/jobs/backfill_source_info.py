@@ -0,0 +1,75 @@
+"""Store source_name/source_url on points ingested before they were extracted at ingest.
+
+Points that already carry either field are left alone, so the job can be
+re-run or resumed at any time. The read path parses chunk text only for
+points this job has not reached yet.
+
+    python -m app.jobs.backfill_source_info
+"""
+import argparse
+import asyncio
+from qdrant_client.http import models
+
+from app.constants import QDRANT_COLLECTION_NAME
+from app.dbhandlers.embeddings_handler import EmbeddingsHandler
+from app.external_services.qdrant_pool import QdrantClientPool
+from app.utils.projects_utils import source_info_from_text
+
+async def backfill(batch_size: int, dry_run: bool):
+    pool = QdrantClientPool(size=1, healthcheck_interval=0)
+    handler = EmbeddingsHandler(pool)
+    client = handler.client
+
+    try:
+        if not dry_run:
+            await handler._ensure_payload_indexes()
+
+        scanned = updated = attributed = 0
+        offset = None
+        while True:
+            records, offset = await client.scroll(
+                collection_name=QDRANT_COLLECTION_NAME,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["text", "source_name", "source_url"],
+                with_vectors=False
+            )
+            operations = []
+            for record in records:
+                payload = record.payload or {}
+                if "source_name" in payload or "source_url" in payload:
+                    continue
+                source_info = source_info_from_text(payload.get("text", ""))
+                attributed += bool(source_info["source_name"] or source_info["source_url"])
+                operations.append(
+                    models.SetPayloadOperation(
+                        set_payload=models.SetPayload(payload=source_info, points=[record.id])
+                    )
+                )
+
+            if operations and not dry_run:
+                await client.batch_update_points(
+                    collection_name=QDRANT_COLLECTION_NAME,
+                    update_operations=operations,
+                    wait=True
+                )
+            scanned += len(records)
+            updated += len(operations)
+            print(f"Scanned {scanned} points, {updated} {'to update' if dry_run else 'updated'}")
+            if offset is None:
+                break
+
+        print(f"{updated} points {'need' if dry_run else 'got'} source fields, {attributed} with a source found")
+    finally:
+        await pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--dry-run", action="store_true", help="Count the points to update without writing")
+    args = parser.parse_args()
+
+    asyncio.run(backfill(args.batch_size, args.dry_run))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Check that the ONNX encoders agree with the torch reference encoder.
+
+Every line of the fixture corpus is embedded by the torch FlagModel and by
+the fp32 and int8 ONNX models. For each, the script reports the per-text
+cosine to the torch vector and how often the corpus nearest neighbour is
+unchanged. It exits non-zero when a model's minimum cosine is below
+--min-cosine:
+
+    python -m app.jobs.encoder_parity --model-dir models/bge-small-en-v1.5-onnx
+"""
+import argparse
+import os
+import sys
+import numpy as np
+
+from app.config import EMBEDDING_ONNX_PATH
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "parity_corpus.txt")
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return embeddings / norms
+
+def neighbour_agreement(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """Share of texts whose nearest other text is the same under both encoders."""
+    def nearest(embeddings):
+        scores = embeddings @ embeddings.T
+        np.fill_diagonal(scores, -np.inf)
+        return scores.argmax(axis=1)
+    return float(np.mean(nearest(reference) == nearest(candidate)))
+
+def check(corpus, model_dir, min_cosine, batch_size):
+    from app.services.encoders import OnnxEncoder, TorchEncoder
+
+    def encode(encoder):
+        return normalize(np.vstack([
+            encoder.encode(corpus[i:i + batch_size])
+            for i in range(0, len(corpus), batch_size)
+        ]))
+
+    reference = encode(TorchEncoder())
+    passed = True
+
+    print(f"{'model':<8} {'min cos':>8} {'mean cos':>9} {'nn agree':>9}")
+    for label, quantized in (("fp32", False), ("int8", True)):
+        candidate = encode(OnnxEncoder(model_dir, quantized=quantized, threads=0))
+        cosines = np.sum(reference * candidate, axis=1)
+        agreement = neighbour_agreement(reference, candidate)
+        print(f"{label:<8} {cosines.min():>8.4f} {cosines.mean():>9.4f} {agreement:>9.2%}")
+
+        if cosines.min() < min_cosine:
+            worst = int(cosines.argmin())
+            print(f"  {label} below {min_cosine} on: {corpus[worst][:80]!r}")
+            passed = False
+    return passed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Texts to compare, one per line")
+    parser.add_argument("--model-dir", default=EMBEDDING_ONNX_PATH)
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    with open(args.corpus) as f:
+        corpus = [line.strip() for line in f if line.strip()]
+
+    if not check(corpus, args.model_dir, args.min_cosine, args.batch_size):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
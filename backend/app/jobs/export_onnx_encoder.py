@@ -0,0 +1,76 @@
+"""Export the embedding model to ONNX and write a dynamically int8-quantized copy.
+
+Writes model.onnx, model_int8.onnx and the tokenizer into --output, which is
+what the onnx backend loads from EMBEDDING_ONNX_PATH. Run the parity check
+afterwards before switching EMBEDDING_BACKEND:
+
+    python -m app.jobs.export_onnx_encoder --output models/bge-small-en-v1.5-onnx
+    python -m app.jobs.encoder_parity --model-dir models/bge-small-en-v1.5-onnx
+
+With --reranker it exports the cross-encoder instead, for RERANK_BACKEND=onnx:
+
+    python -m app.jobs.export_onnx_encoder --reranker --output models/bge-reranker-base-onnx
+"""
+import argparse
+import os
+
+from app.config import EMBEDDING_ONNX_PATH, RERANK_ONNX_PATH
+from app.constants import (
+    EMBEDDING_MODEL_NAME,
+    ONNX_MODEL_FILE,
+    ONNX_QUANTIZED_MODEL_FILE,
+    RERANK_MODEL_NAME
+)
+
+def export(model_name: str, output_dir: str, opset: int, reranker: bool = False):
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model_class = AutoModelForSequenceClassification if reranker else AutoModel
+    model = model_class.from_pretrained(model_name).eval()
+    tokenizer.save_pretrained(output_dir)
+
+    if reranker:
+        sample = tokenizer([["export query", "export passage"]], return_tensors="pt")
+        output_name, output_axes = "logits", {0: "batch"}
+    else:
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        output_name, output_axes = "last_hidden_state", {0: "batch", 1: "sequence"}
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes[output_name] = output_axes
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+    print(f"Exported {model_name} to {model_path}")
+
+    quantized_path = os.path.join(output_dir, ONNX_QUANTIZED_MODEL_FILE)
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    print(f"Wrote int8 model to {quantized_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model")
+    parser.add_argument("--output")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--reranker", action="store_true", help="export the cross-encoder")
+    args = parser.parse_args()
+
+    model = args.model or (RERANK_MODEL_NAME if args.reranker else EMBEDDING_MODEL_NAME)
+    output = args.output or (RERANK_ONNX_PATH if args.reranker else EMBEDDING_ONNX_PATH)
+    export(model, output, args.opset, reranker=args.reranker)
+
+if __name__ == "__main__":
+    main()
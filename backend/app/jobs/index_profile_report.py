@@ -0,0 +1,120 @@
+"""Recall-vs-latency report for the Qdrant index profiles.
+
+Each held-out query (one per line in --queries) is searched exactly to get
+ground truth, then with every profile's search params. With --rebuild each
+profile is first applied to --collection, so point it at a scratch copy of
+the embeddings collection rather than the live one.
+
+    python -m app.jobs.index_profile_report --queries held_out.txt --collection scratch --rebuild
+"""
+import argparse
+import asyncio
+import time
+import numpy as np
+from qdrant_client.http import models
+
+from app.constants import QDRANT_COLLECTION_NAME, QDRANT_INDEX_PROFILES
+from app.dbhandlers.embeddings_handler import EmbeddingsHandler
+from app.external_services.qdrant_pool import QdrantClientPool
+from app.utils.vector_utils import get_index_profile, search_params_for
+
+async def wait_for_index(handler: EmbeddingsHandler, collection_name: str, poll_interval: float = 2.0):
+    """Block until Qdrant has finished re-indexing the collection."""
+    while True:
+        info = await handler.client.get_collection(collection_name=collection_name)
+        if info.status == models.CollectionStatus.GREEN:
+            return
+        await asyncio.sleep(poll_interval)
+
+async def search_ids(handler, collection_name, vector, limit, search_params):
+    started = time.perf_counter()
+    result = await handler.client.query_points(
+        collection_name=collection_name,
+        query=vector,
+        limit=limit,
+        search_params=search_params,
+        with_payload=False
+    )
+    latency_ms = (time.perf_counter() - started) * 1000
+    return [point.id for point in result.points], latency_ms
+
+async def report(queries, collection_name, profiles, limit, rebuild, min_recall):
+    from app.services.embeddings_service import EmbeddingService
+
+    pool = QdrantClientPool(size=1, healthcheck_interval=0)
+    handler = EmbeddingsHandler(pool)
+    try:
+        handler.collection_vector_size = await handler.get_collection_vector_size(collection_name)
+        vectors = [
+            handler._fit_vector(EmbeddingService.to_vector(embedding))
+            for embedding in EmbeddingService.encode_texts(queries)
+        ]
+
+        exact = models.SearchParams(exact=True)
+        ground_truth = [
+            set((await search_ids(handler, collection_name, vector, limit, exact))[0])
+            for vector in vectors
+        ]
+
+        rows = []
+        for name in profiles:
+            profile = get_index_profile(name)
+            if rebuild:
+                await handler.apply_index_profile(name, collection_name)
+                await wait_for_index(handler, collection_name)
+
+            recalls, latencies = [], []
+            search_params = search_params_for(profile)
+            for vector, expected in zip(vectors, ground_truth):
+                ids, latency_ms = await search_ids(handler, collection_name, vector, limit, search_params)
+                if expected:
+                    recalls.append(len(expected & set(ids)) / len(expected))
+                latencies.append(latency_ms)
+
+            rows.append({
+                "profile": name,
+                "recall": float(np.mean(recalls)) if recalls else 0.0,
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p95_ms": float(np.percentile(latencies, 95))
+            })
+    finally:
+        await pool.close()
+
+    print(f"{'profile':<10} {'recall@' + str(limit):>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in rows:
+        print(f"{row['profile']:<10} {row['recall']:>10.3f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f}")
+
+    # Profiles are declared from most to least resource hungry
+    acceptable = [row for row in rows if row["recall"] >= min_recall]
+    if acceptable:
+        print(f"Cheapest profile with recall >= {min_recall}: {acceptable[-1]['profile']}")
+    else:
+        print(f"No profile reached recall >= {min_recall}")
+    if not rebuild:
+        print("Index-time settings were not applied; only search params differ between rows")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", required=True, help="Held-out queries, one per line")
+    parser.add_argument("--collection", default=QDRANT_COLLECTION_NAME)
+    parser.add_argument("--profiles", nargs="+", default=list(QDRANT_INDEX_PROFILES))
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    parser.add_argument("--rebuild", action="store_true", help="Apply each profile before measuring it")
+    args = parser.parse_args()
+
+    with open(args.queries) as f:
+        queries = [line.strip() for line in f if line.strip()]
+
+    asyncio.run(report(
+        queries,
+        args.collection,
+        [name for name in QDRANT_INDEX_PROFILES if name in args.profiles],
+        args.limit,
+        args.rebuild,
+        args.min_recall
+    ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Re-create the embeddings collection at the model's native dimension.
+
+Vectors used to be zero-padded to 1024 dimensions, so the native vector is
+simply the stored vector's prefix: points are copied across with trimmed
+vectors and no re-embedding.
+
+    python -m app.jobs.migrate_native_dimension --dimension 384 --swap
+
+Pause ingestion for the whole run: points written to the source after they
+were copied would not reach the target, and the counts are compared again
+right before the swap to catch that.
+
+With --swap, when the collection name is already an alias it is switched
+atomically and the old collection is kept. When it is a real collection it
+has to be dropped before the alias can take its name, so a snapshot of it
+is taken first and the alias step is retried. Running workers notice the
+new dimension on their next failed search or upsert and re-read it.
+"""
+import argparse
+import asyncio
+from qdrant_client.http import models
+
+from app.constants import QDRANT_COLLECTION_NAME
+from app.dbhandlers.embeddings_handler import EmbeddingsHandler
+from app.external_services.qdrant_pool import QdrantClientPool
+
+async def migrate(dimension: int, target: str, batch_size: int, swap: bool):
+    pool = QdrantClientPool(size=1, healthcheck_interval=0)
+    handler = EmbeddingsHandler(pool)
+    client = handler.client
+
+    try:
+        source_size = await handler.get_collection_vector_size(QDRANT_COLLECTION_NAME)
+        if source_size == dimension:
+            print(f"'{QDRANT_COLLECTION_NAME}' already stores {dimension}-d vectors, nothing to do")
+            return
+        if source_size < dimension:
+            raise ValueError(f"Cannot trim {source_size}-d vectors to {dimension}-d")
+
+        if await client.collection_exists(collection_name=target):
+            print(f"Resuming into existing collection '{target}'")
+            # Workers follow the alias without restarting, so the target needs every index up front
+            await handler._ensure_payload_indexes(target)
+        else:
+            await handler.create_collection(target, dimension)
+
+        copied = 0
+        offset = None
+        while True:
+            records, offset = await client.scroll(
+                collection_name=QDRANT_COLLECTION_NAME,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if records:
+                await client.upsert(
+                    collection_name=target,
+                    points=[
+                        models.PointStruct(
+                            id=record.id,
+                            vector=record.vector[:dimension],
+                            payload=record.payload
+                        )
+                        for record in records
+                    ],
+                    wait=True
+                )
+                copied += len(records)
+                print(f"Copied {copied} points")
+            if offset is None:
+                break
+
+        source_count, target_count = await point_counts(client, target)
+        if source_count != target_count:
+            raise RuntimeError(f"Point count mismatch: source {source_count}, target {target_count}")
+        print(f"Copied {target_count} points into '{target}'")
+
+        if swap:
+            await swap_alias(client, target)
+    finally:
+        await pool.close()
+
+async def point_counts(client, target: str):
+    source_count = (await client.count(collection_name=QDRANT_COLLECTION_NAME, exact=True)).count
+    target_count = (await client.count(collection_name=target, exact=True)).count
+    return source_count, target_count
+
+async def swap_alias(client, target: str, attempts: int = 5):
+    """Point QDRANT_COLLECTION_NAME at target, keeping the old data recoverable."""
+    source_count, target_count = await point_counts(client, target)
+    if source_count != target_count:
+        raise RuntimeError(
+            f"Source changed since the copy ({source_count} vs {target_count} points); "
+            f"pause ingestion and re-run"
+        )
+
+    aliases = (await client.get_aliases()).aliases
+    current = next((a.collection_name for a in aliases if a.alias_name == QDRANT_COLLECTION_NAME), None)
+    operations = [
+        models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=target, alias_name=QDRANT_COLLECTION_NAME)
+        )
+    ]
+
+    if current is not None:
+        # Delete and create in one call is atomic, and the old collection stays put
+        await client.update_collection_aliases(
+            change_aliases_operations=[
+                models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=QDRANT_COLLECTION_NAME))
+            ] + operations
+        )
+        print(f"'{QDRANT_COLLECTION_NAME}' now aliases '{target}'; '{current}' is kept and can be deleted")
+        return
+
+    # An alias cannot share a name with a live collection, so the source has
+    # to go first; searches fail for the moment in between.
+    snapshot = await client.create_snapshot(collection_name=QDRANT_COLLECTION_NAME, wait=True)
+    print(f"Snapshot of '{QDRANT_COLLECTION_NAME}' taken: {snapshot.name if snapshot else 'unknown'}")
+    await client.delete_collection(collection_name=QDRANT_COLLECTION_NAME)
+
+    for attempt in range(1, attempts + 1):
+        try:
+            await client.update_collection_aliases(change_aliases_operations=operations)
+            print(f"'{QDRANT_COLLECTION_NAME}' now aliases '{target}'")
+            return
+        except Exception as e:
+            print(f"Creating alias failed (attempt {attempt}/{attempts}): {str(e)}")
+            await asyncio.sleep(2 ** attempt)
+
+    raise RuntimeError(
+        f"'{QDRANT_COLLECTION_NAME}' was dropped but the alias to '{target}' could not be created. "
+        f"All points are in '{target}'; create the alias by hand, or restore the snapshot "
+        f"'{snapshot.name if snapshot else ''}' to roll back"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dimension", type=int, help="Target dimension (defaults to the loaded model's)")
+    parser.add_argument("--target", help="Collection to copy into (defaults to '<collection>-<dimension>')")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--swap", action="store_true", help="Drop the source and alias its name to the target")
+    args = parser.parse_args()
+
+    dimension = args.dimension
+    if dimension is None:
+        from app.services.embeddings_service import EmbeddingService
+        dimension = EmbeddingService.encode_texts(["dimension probe"]).shape[1]
+
+    target = args.target or f"{QDRANT_COLLECTION_NAME}-{dimension}"
+    asyncio.run(migrate(dimension, target, args.batch_size, args.swap))
+
+if __name__ == "__main__":
+    main()
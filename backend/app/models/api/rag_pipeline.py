@@ -8,6 +8,14 @@ class DocumentMetadata(BaseModel):
     content_type: str
     text: str
     document_id: str
+    content_hash: Optional[str] = None
+    chunk_number: Optional[int] = None
+    total_chunks: Optional[int] = None
+    text_length: Optional[int] = None
+    start_pos: Optional[int] = None
+    end_pos: Optional[int] = None
+    source_name: Optional[str] = None
+    source_url: Optional[str] = None
     title: Optional[str] = None
     description: Optional[str] = None
     tags: Optional[List[str]] = None
@@ -5,4 +5,5 @@ class User(BaseModel):
     email: EmailStr
     name: str
     free: bool = True
-    paid: bool = False
\ No newline at end of file
+    paid: bool = False
+    message_count: int = 0
\ No newline at end of file
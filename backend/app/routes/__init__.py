@@ -2,7 +2,11 @@ from app.custom_fastapi import CustmFastAPI
 
 from app.routes.agent import agent_router
 from app.routes.project import projects_router
+from app.routes.admin import admin_router
+from app.routes.health import health_router
 
 def init_routes(app: CustmFastAPI):
     app.include_router(agent_router)
-    app.include_router(projects_router)
\ No newline at end of file
+    app.include_router(projects_router)
+    app.include_router(admin_router)
+    app.include_router(health_router)
\ No newline at end of file
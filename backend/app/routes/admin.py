@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.constants import QDRANT_INDEX_PROFILES
+from app.custom_fastapi import CustmFastAPI
+from app.utils.app_utils import get_app
+from app.utils.dependencies import verify_admin
+
+admin_router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(verify_admin)])
+
+@admin_router.get("/index-profile")
+async def get_index_profile(app: CustmFastAPI = Depends(get_app)):
+    return {
+        "profile": app.embeddings_handler.index_profile,
+        "available": QDRANT_INDEX_PROFILES
+    }
+
+@admin_router.post("/index-profile/{profile}")
+async def apply_index_profile(profile: str, app: CustmFastAPI = Depends(get_app)):
+    """Re-index the embeddings collection with a named profile.
+
+    This worker searches with the profile's params at once; the others switch
+    within QDRANT_INDEX_PROFILE_CHECK_INTERVAL.
+    """
+    if profile not in QDRANT_INDEX_PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown profile, expected one of {sorted(QDRANT_INDEX_PROFILES)}"
+        )
+
+    try:
+        await app.embeddings_handler.apply_index_profile(profile)
+    except Exception as e:
+        print(f"Failed to apply index profile: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to apply index profile: {str(e)}")
+
+    return {"success": True, "profile": profile}
+
+@admin_router.get("/cache/stats")
+async def cache_stats(app: CustmFastAPI = Depends(get_app)):
+    return {
+        "semantic": await app.semantic_cache.stats(),
+        "embeddings": app.embeddings_service.cache.stats()
+    }
+
+@admin_router.post("/cache/invalidate")
+async def invalidate_semantic_cache(app: CustmFastAPI = Depends(get_app)):
+    await app.semantic_cache.invalidate()
+    return {"success": True}
@@ -1,16 +1,24 @@
 from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
 
+from app.custom_fastapi import CustmFastAPI
 from app.utils.app_utils import get_app
 from app.external_services.db import DB
 from app.config import GOOGLE_CLIENT_ID
+from app.constants import FREE_MESSAGE_LIMIT
 from app.utils.dependencies import get_db 
+from app.utils.stream_utils import format_sse
 
 agent_router = APIRouter(prefix="/agent", tags=["agent_router"])
 
 @agent_router.post("/auth/google")
-async def auth_google(request: Request, db: DB = Depends(get_db)):
+async def auth_google(
+    request: Request,
+    db: DB = Depends(get_db),
+    app: CustmFastAPI = Depends(get_app)
+):
     """Handles Google login by verifying the token, and creating/retrieving the user."""
     if not GOOGLE_CLIENT_ID:
         raise HTTPException(status_code=500, detail="Google Client ID is not configured on the server.")
@@ -30,12 +38,12 @@ async def auth_google(request: Request, db: DB = Depends(get_db)):
         if not all([user_id, email, name]):
              raise HTTPException(status_code=400, detail="Invalid token payload.")
 
-        user = db.get_user(user_id)
+        user = await db.get_user(user_id)
         
         if user is None:
-            user = db.create_user(user_id, email, name)
+            user = await db.create_user(user_id, email, name)
 
-        msg_count = db.count_user_messages(user_id)
+        quota = await app.quota_service.quota_for_user(user)
         
         return {
             "success": True,
@@ -46,7 +54,7 @@ async def auth_google(request: Request, db: DB = Depends(get_db)):
             },
             "isPaid": user.get("paid", False),
             "isFree": user.get("free", True),
-            "messageCount": msg_count
+            "messageCount": quota["msg_count"]
         }
 
     except ValueError as e:
@@ -55,58 +63,91 @@ async def auth_google(request: Request, db: DB = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def limit_reached_response(quota: dict) -> dict:
+    return {
+        "success": True,
+        "conversation": {"response": ["You have reached your free message limit."]},
+        "limitReached": True,
+        "free": quota["free"],
+        "paid": quota["paid"]
+    }
+
+def conversation_response(conversation: dict, quota: dict) -> dict:
+    limit_reached_after_send = quota["free"] and not quota["paid"] and (quota["msg_count"] + 1) >= FREE_MESSAGE_LIMIT
+
+    return {
+        "success": True,
+        "conversation": conversation,
+        "limitReached": limit_reached_after_send,
+        "free": quota["free"],
+        "paid": quota["paid"]
+    }
+
 @agent_router.post("/conversation")
-async def agent_conversation(request: Request, db: DB = Depends(get_db)):
+async def agent_conversation(request: Request, app: CustmFastAPI = Depends(get_app)):
     body = await request.json()
     user_message = body["message"]
     user_info = body.get("user")
 
-    app = get_app()
-
     if not user_info:
-        conversation = await app.agent_service.conversation(user_message, db=db)
+        conversation = await app.agent_service.conversation(user_message)
         return {"success": True, "conversation": conversation, "limitReached": False, "free": True}
 
-    user_id = user_info.get("id")
-    user = db.get_user(user_id)
-    
-    if user is None:
-        email = user_info.get("email")
-        name = user_info.get("name")
-        user = db.create_user(user_id, email, name)
+    quota = await app.quota_service.get_quota(user_info)
 
-    free = user.get("free", True)
-    paid = user.get("paid", False)
+    if quota["limit_reached"]:
+        return limit_reached_response(quota)
 
-    msg_count = db.count_user_messages(user_id)
+    conversation = await app.agent_service.conversation(user_message)
+    await app.write_behind.store_message(quota["user_id"], user_message, str(conversation))
+    await app.quota_service.record_message(quota)
 
-    if free and not paid and msg_count >= 5:
-        return {
-            "success": True,
-            "conversation": {"response": ["You have reached your free message limit."]},
-            "limitReached": True,
-            "free": free,
-            "paid": paid
-        }
+    return conversation_response(conversation, quota)
 
-    conversation = await app.agent_service.conversation(user_message, db=db)
-    db.store_message(user_id, user_message, str(conversation))
+@agent_router.post("/conversation/stream")
+async def agent_conversation_stream(request: Request, app: CustmFastAPI = Depends(get_app)):
+    """Same as /conversation, streamed as Server-Sent Events.
 
-    limit_reached_after_send = free and not paid and (msg_count + 1) >= 5
+    Emits `bullet_delta` events as response text arrives, a `bullet` event as
+    each bullet completes, and a final `done` event carrying the payload
+    /conversation would have returned (including sources and relevant projects).
+    """
+    body = await request.json()
+    user_message = body["message"]
+    user_info = body.get("user")
 
-    return {
-        "success": True,
-        "conversation": conversation,
-        "limitReached": limit_reached_after_send,
-        "free": free,
-        "paid": paid
-    }
+    quota = await app.quota_service.get_quota(user_info) if user_info else None
+
+    async def events():
+        if quota and quota["limit_reached"]:
+            yield format_sse("done", limit_reached_response(quota))
+            return
+
+        async for event, data in app.agent_service.conversation_stream(user_message):
+            if event != "done":
+                yield format_sse(event, data)
+                continue
+
+            if not quota:
+                yield format_sse("done", {"success": True, "conversation": data, "limitReached": False, "free": True})
+                continue
+
+            # Counted before `done` goes out: a client may disconnect as soon as it reads it
+            await app.write_behind.store_message(quota["user_id"], user_message, str(data))
+            await app.quota_service.record_message(quota)
+            yield format_sse("done", conversation_response(data, quota))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @agent_router.post("/user/pay")
-async def user_pay(request: Request, db: DB = Depends(get_db)):
+async def user_pay(request: Request, app: CustmFastAPI = Depends(get_app)):
     body = await request.json()
     user_id = body.get("userId")
     if not user_id:
         return {"success": False, "error": "Missing userId"}
-    db.set_user_paid(user_id)
+    await app.quota_service.set_paid(user_id)
     return {"success": True}
\ No newline at end of file
@@ -0,0 +1,39 @@
+import asyncio
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from app.config import QDRANT_TIMEOUT
+from app.custom_fastapi import CustmFastAPI
+from app.utils.app_utils import get_app
+
+health_router = APIRouter(tags=["health"])
+
+@health_router.get("/healthz", summary="Liveness: the process is serving requests")
+async def healthz():
+    return {"status": "ok"}
+
+@health_router.get(
+    "/readyz",
+    summary="Readiness: the model is loaded and Qdrant is reachable",
+    responses={
+        200: {"description": "Ready"},
+        503: {"description": "Still warming up or a dependency is down"},
+    },
+)
+async def readyz(app: CustmFastAPI = Depends(get_app)):
+    checks = {
+        "model": app.embeddings_service.ready,
+        "collection": app.embeddings_handler.ready,
+        "qdrant": False
+    }
+    try:
+        await asyncio.wait_for(app.qdrant_pool.client().get_collections(), timeout=QDRANT_TIMEOUT)
+        checks["qdrant"] = True
+    except Exception as e:
+        print(f"Readiness check could not reach Qdrant: {str(e)}")
+
+    content = {"status": "ready" if all(checks.values()) else "not_ready", "checks": checks}
+    task = app.warm_up_task
+    if task is not None and task.done() and not task.cancelled() and task.exception():
+        content["error"] = str(task.exception())
+    return JSONResponse(content=content, status_code=200 if all(checks.values()) else 503)
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Depends
 from fastapi.responses import JSONResponse
 from typing import Optional, Dict, Any
 import asyncio
 
-from app.utils.projects_utils import process_text_file
+from app.custom_fastapi import CustmFastAPI
 from app.utils.app_utils import get_app
 
 projects_router = APIRouter(prefix="/projects", tags=["projects"])
@@ -20,7 +20,9 @@ projects_router = APIRouter(prefix="/projects", tags=["projects"])
 async def create(
     file: UploadFile = File(...),
     custom_metadata: Optional[Dict[str, Any]] = None,
-    background_tasks: BackgroundTasks = None
+    incremental: bool = False,
+    background_tasks: BackgroundTasks = None,
+    app: CustmFastAPI = Depends(get_app)
 ):
     try:
         if not file.filename.endswith('.txt'):
@@ -28,28 +30,24 @@ async def create(
                 status_code=400,
                 detail="Only .txt files are accepted"
             )
-        
-        app = get_app()
+        if not app.embeddings_handler.ready:
+            raise HTTPException(
+                status_code=503,
+                detail="Embedding model is still loading, retry shortly"
+            )
 
-        content = await file.read()
-        text = content.decode('utf-8')
+        job = await app.projects_service.ingest_upload(file, custom_metadata, incremental)
 
         if background_tasks:
-            background_tasks.add_task(
-                process_and_store_embeddings,
-                app,
-                text,
-                file.filename,
-                custom_metadata
-            )
+            # The job runs on its own; progress is served by GET /projects/jobs/{job_id}
             return JSONResponse(
-                content={"status": "processing_started"},
+                content={"status": "processing_started", "job_id": job.id},
                 status_code=202
             )
 
         try:
             result = await asyncio.wait_for(
-                process_and_store_embeddings(app, text, file.filename, custom_metadata),
+                app.projects_service.finish(job),
                 timeout=300  # 5 minute timeout
             )
             return JSONResponse(content=result, status_code=200)
@@ -69,7 +67,29 @@ async def create(
         )
     
 
-async def process_and_store_embeddings(app, text, filename, custom_metadata):
-    """Encapsulated processing logic"""
-    documents = await process_text_file(text, filename)
-    return await app.projects_service.create(documents, custom_metadata)
\ No newline at end of file
+@projects_router.get(
+    "/jobs/{job_id}",
+    summary="Report progress of an ingestion job",
+    responses={
+        200: {"description": "Job progress"},
+        404: {"description": "Unknown job"},
+    },
+)
+async def get_job(job_id: str, app: CustmFastAPI = Depends(get_app)):
+    progress = app.projects_service.get_job(job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content=progress, status_code=200)
+
+@projects_router.delete(
+    "/jobs/{job_id}",
+    summary="Cancel a running ingestion job",
+    responses={
+        202: {"description": "Cancellation requested"},
+        404: {"description": "No running job with this id"},
+    },
+)
+async def cancel_job(job_id: str, app: CustmFastAPI = Depends(get_app)):
+    if not app.projects_service.cancel(job_id):
+        raise HTTPException(status_code=404, detail="No running job with this id")
+    return JSONResponse(content={"status": "cancelling", "job_id": job_id}, status_code=202)
@@ -1,9 +1,70 @@
+import asyncio
+
 from app.custom_fastapi import CustmFastAPI
 
-def init_services(app: CustmFastAPI):
+async def init_services(app: CustmFastAPI):
     """Initialize services in the app state."""
     from app.services.embeddings_service import EmbeddingService
     from app.services.agent_service import AgentService
+    from app.services.projects_service import ProjectsService
+    from app.external_services.claude_ai_client import ClaudeAIClient
+    from app.services.semantic_cache import SemanticCache
+    from app.services.quota_service import QuotaService
+    from app.services.write_behind import WriteBehindBuffer
+    from app.services.rerank_service import RerankService
+    from app.services.embedding_process_pool import EmbeddingProcessPool
+    from app.config import EMBEDDING_BACKGROUND_PRELOAD, EMBEDDING_WORKER_PROCESSES
+
+    app.embeddings_service = EmbeddingService(app.embeddings_handler)
+    app.embeddings_service.start()
+    app.claude_client = ClaudeAIClient(app.http_client)
+    app.semantic_cache = SemanticCache(app.qdrant_pool)
+    app.quota_service = QuotaService(app.db)
+    app.rerank_service = RerankService()
+    app.write_behind = WriteBehindBuffer(app.db)
+    app.write_behind.start()
+    app.agent_service = AgentService(
+        app.embeddings_service,
+        app.claude_client,
+        app.semantic_cache,
+        app.rerank_service,
+        app.write_behind
+    )
+    embedding_pool = EmbeddingProcessPool() if EMBEDDING_WORKER_PROCESSES > 0 else None
+    app.projects_service = ProjectsService(
+        app.embeddings_handler,
+        app.semantic_cache,
+        app.job_store,
+        embedding_pool=embedding_pool
+    )
+
+    app.warm_up_task = None
+    if EMBEDDING_BACKGROUND_PRELOAD:
+        app.warm_up_task = asyncio.create_task(warm_up_services(app))
+    else:
+        await warm_up_services(app)
+
+async def warm_up_services(app: CustmFastAPI):
+    """Load the models, then prepare the collection and resume interrupted jobs."""
+    try:
+        dimension = await app.embeddings_service.warm_up()
+        await app.rerank_service.warm_up()
+        await app.embeddings_handler.initialize(vector_size=dimension)
+        await app.projects_service.resume()
+        print("Services warmed up")
+    except Exception as e:
+        print(f"Service warm-up failed: {str(e)}")
+        raise
 
-    app.embeddings_service = EmbeddingService()
-    app.agent_service = AgentService()
\ No newline at end of file
+async def close_services(app: CustmFastAPI):
+    """Release resources held by the services."""
+    if app.warm_up_task is not None and not app.warm_up_task.done():
+        app.warm_up_task.cancel()
+        try:
+            await app.warm_up_task
+        except (asyncio.CancelledError, Exception):
+            pass
+    await app.projects_service.close()
+    await app.embeddings_service.close()
+    app.rerank_service.close()
+    await app.write_behind.close()
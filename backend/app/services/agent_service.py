@@ -1,12 +1,33 @@
+from typing import Any, AsyncIterator, Dict, Tuple
+
 from app.agent.project import ProjectAgent
-from app.external_services.db import DB
+from app.external_services.claude_ai_client import ClaudeAIClient
+from app.services.embeddings_service import EmbeddingService
+from app.services.rerank_service import RerankService
+from app.services.semantic_cache import SemanticCache
+from app.services.write_behind import WriteBehindBuffer
 
 class AgentService:
-    def __init__(self):
-        self.agent = ProjectAgent()
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        claude_client: ClaudeAIClient,
+        semantic_cache: SemanticCache,
+        rerank_service: RerankService,
+        write_behind: WriteBehindBuffer
+    ):
+        self.agent = ProjectAgent(embedding_service, claude_client, semantic_cache, rerank_service)
+        self.write_behind = write_behind
 
-    async def conversation(self, user_message: str, db):
-        """Store checkout product data via handler."""
+    async def conversation(self, user_message: str):
+        """Answer the message and queue it for tracking."""
         response = await self.agent.process(user_message)
-        await db.track_message({**response, 'user_message': user_message})
-        return response
\ No newline at end of file
+        await self.write_behind.track_message({**response, 'user_message': user_message})
+        return response
+
+    async def conversation_stream(self, user_message: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Stream agent events, tracking the conversation once it completes."""
+        async for event, data in self.agent.process_stream(user_message):
+            yield event, data
+            if event == "done":
+                await self.write_behind.track_message({**data, 'user_message': user_message})
@@ -0,0 +1,108 @@
+import asyncio
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+class EmbeddingBatcher:
+    """Groups concurrent encode requests into micro-batches run on a dedicated worker."""
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5
+    ):
+        self.encode = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-batcher")
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the batching loop on the running event loop."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, texts: List[str]) -> np.ndarray:
+        """Queue texts for encoding and wait for their vectors."""
+        if self._task is None:
+            raise RuntimeError("EmbeddingBatcher has not been started")
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._queue.put_nowait((text, future))
+            futures.append(future)
+
+        return np.vstack(await asyncio.gather(*futures))
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        """Wait for one item, then keep collecting until the batch is full or max_wait elapses."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            pending = [(text, future) for text, future in batch if not future.done()]
+            if not pending:
+                continue
+
+            try:
+                vectors = await loop.run_in_executor(
+                    self.executor,
+                    self.encode,
+                    [text for text, _ in pending]
+                )
+            except asyncio.CancelledError:
+                for _, future in pending:
+                    future.cancel()
+                raise
+            except Exception as e:
+                print(f"Embedding batch of {len(pending)} failed: {str(e)}")
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(pending, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    async def close(self):
+        """Stop the batching loop, fail queued requests and join the worker."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("EmbeddingBatcher is shutting down"))
+
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,93 @@
+import sys
+import time
+import unicodedata
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import EMBEDDING_CACHE_MAX_BYTES, EMBEDDING_CACHE_TTL
+
+class EmbeddingCache:
+    """Byte-bounded LRU/TTL cache of query embeddings keyed on normalized text."""
+
+    def __init__(
+        self,
+        model_name: str,
+        max_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+        ttl: float = EMBEDDING_CACHE_TTL
+    ):
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, float, int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse differences the tokenizer ignores anyway."""
+        return " ".join(unicodedata.normalize("NFKC", text).split())
+
+    def _key(self, text: str) -> Tuple[str, str]:
+        return self.model_name, self.normalize(text)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self._key(text)
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, text: str, embedding: np.ndarray):
+        if self.max_bytes <= 0:
+            return
+        key = self._key(text)
+
+        # Own a compact read-only copy so callers cannot mutate cached rows
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.flags.writeable = False
+        size = embedding.nbytes + sys.getsizeof(key[1])
+        if size > self.max_bytes:
+            # Could never fit; evicting everything for it would still break the bound
+            self.rejections += 1
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        while self._entries and self.bytes + size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+        self._entries[key] = (embedding, time.monotonic() + self.ttl, size)
+        self.bytes += size
+
+    def _remove(self, key: Tuple[str, str]):
+        _, _, size = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "rejections": self.rejections
+        }
@@ -0,0 +1,82 @@
+import asyncio
+import multiprocessing
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+from app.config import EMBEDDING_BACKEND, EMBEDDING_WORKER_PROCESSES, EMBEDDING_WORKER_THREADS
+
+def _init_worker(threads: int):
+    """Pin the encoder's thread pools before the model is loaded, once per worker."""
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    if EMBEDDING_BACKEND == "torch":
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+
+    from app.services.embeddings_service import EmbeddingService
+    EmbeddingService.get_dimension()
+
+def _encode_into(texts: List[str], shm_name: str, dimension: int) -> int:
+    """Encode texts straight into the parent's shared memory block."""
+    from app.services.embeddings_service import EmbeddingService
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray((len(texts), dimension), dtype=np.float32, buffer=shm.buf)
+        out[:] = EmbeddingService.encode_texts(texts)
+        del out
+    finally:
+        shm.close()
+    return len(texts)
+
+class EmbeddingProcessPool:
+    """Encodes ingestion batches in worker processes, each with its own model copy.
+
+    Workers are spawned (not forked, torch does not survive forking), pin
+    their torch threads so processes x threads matches the cores, and write
+    vectors into a shared memory block so only the texts are pickled.
+    """
+
+    def __init__(
+        self,
+        dimension: Optional[int] = None,
+        processes: int = EMBEDDING_WORKER_PROCESSES,
+        threads_per_process: int = EMBEDDING_WORKER_THREADS
+    ):
+        self.dimension = dimension
+        self.processes = max(1, processes)
+        self.threads_per_process = max(1, threads_per_process)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.threads_per_process,)
+        )
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        if self.dimension is None:
+            from app.services.embeddings_service import EmbeddingService
+            self.dimension = await asyncio.to_thread(EmbeddingService.get_dimension)
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        shm = shared_memory.SharedMemory(create=True, size=len(texts) * self.dimension * 4)
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, _encode_into, texts, shm.name, self.dimension)
+            shared = np.ndarray((len(texts), self.dimension), dtype=np.float32, buffer=shm.buf)
+            vectors = shared.copy()
+            del shared
+            return vectors
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
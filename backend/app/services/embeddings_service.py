@@ -1,44 +1,115 @@
+import asyncio
+import threading
 import numpy as np
-from FlagEmbedding import FlagModel
-from qdrant_client.http import models 
-from typing import List, Optional
+from qdrant_client.http import models
+from typing import Dict, List, Optional
 
+from app.config import EMBEDDING_MAX_BATCH_SIZE, EMBEDDING_MAX_WAIT_MS
+from app.constants import EMBEDDING_MODEL_NAME
 from app.dbhandlers.embeddings_handler import EmbeddingsHandler
-from app.utils.vector_utils import pad_vector
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache
+from app.services.encoders import Encoder, create_encoder
 
 class EmbeddingService:
-    model = FlagModel(
-        'BAAI/bge-small-en-v1.5',
-        query_instruction_for_retrieval="Represent this sentence for searching relevant passages:",
-        use_fp16=False 
-    )
+    # Loaded on first use or by warm_up, never at import time
+    _model: Optional[Encoder] = None
+    _model_lock = threading.Lock()
+    _dimension: Optional[int] = None
+
+    def __init__(self, embeddings_handler: EmbeddingsHandler):
+        self.embeddings_handler = embeddings_handler
+        self.cache = EmbeddingCache(EMBEDDING_MODEL_NAME)
+        self.batcher = EmbeddingBatcher(
+            EmbeddingService.encode_texts,
+            max_batch_size=EMBEDDING_MAX_BATCH_SIZE,
+            max_wait_ms=EMBEDDING_MAX_WAIT_MS
+        )
+
+    @staticmethod
+    def get_model() -> Encoder:
+        if EmbeddingService._model is None:
+            with EmbeddingService._model_lock:
+                if EmbeddingService._model is None:
+                    EmbeddingService._model = create_encoder()
+        return EmbeddingService._model
 
     @staticmethod
-    def create_embeddings(text: str) -> List[float]:
-        embeddings = EmbeddingService.model.encode(text)
-        embeddings = np.array(embeddings)
+    def get_dimension() -> int:
+        """Native dimension of the model's embeddings; loads the model if needed."""
+        if EmbeddingService._dimension is None:
+            EmbeddingService._dimension = EmbeddingService.encode_texts(["dimension probe"]).shape[1]
+        return EmbeddingService._dimension
+
+    @property
+    def dimension(self) -> int:
+        return EmbeddingService.get_dimension()
+
+    @property
+    def ready(self) -> bool:
+        return EmbeddingService._dimension is not None
+
+    async def warm_up(self) -> int:
+        """Load the model and run one encode off the event loop."""
+        return await asyncio.to_thread(EmbeddingService.get_dimension)
+
+    def start(self):
+        self.batcher.start()
 
-        norm = np.linalg.norm(embeddings)
-        if norm > 0:
-            embeddings = embeddings / norm 
+    async def close(self):
+        await self.batcher.close()
 
-        return pad_vector(embeddings.tolist(), 1024)
+    @staticmethod
+    def encode_texts(texts: List[str]) -> np.ndarray:
+        """Encode texts in one forward pass into L2-normalized float32 rows."""
+        embeddings = np.asarray(EmbeddingService.get_model().encode(texts), dtype=np.float32)
+        embeddings = embeddings.reshape(len(texts), -1)
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return embeddings / norms
 
     @staticmethod
+    def to_vector(embedding: np.ndarray) -> List[float]:
+        """Convert an encoded row into the vector stored in Qdrant."""
+        return embedding.tolist()
+
+    async def create_embeddings(self, text: str) -> np.ndarray:
+        return (await self.create_embeddings_batch([text]))[0]
+
+    async def create_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+        """Encode texts as float32 rows, serving repeats from the cache and the
+        rest through the shared micro-batcher without blocking the event loop."""
+        embeddings = [self.cache.get(text) for text in texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        if missing:
+            encoded = await self.batcher.submit([texts[i] for i in missing])
+            for i, embedding in zip(missing, encoded):
+                self.cache.put(texts[i], embedding)
+                embeddings[i] = embedding
+
+        return np.vstack(embeddings)
+
     async def get_embeddings(
-        vector: List[float],
+        self,
+        vector: np.ndarray,
         limit: int = 10,
         threshold: Optional[float] = None,
         includes_values: bool = False,
-        filter_condition: Optional[models.Filter] = None
+        filter_condition: Optional[models.Filter] = None,
+        query_text: Optional[str] = None
     ):
-        embeddings_handler = EmbeddingsHandler()
-        raw_results = await embeddings_handler.query_embeddings(
+        raw_results = await self.embeddings_handler.query_embeddings(
             vector=vector,
             top_k=limit,
             includes_values=includes_values,
             filter_condition=filter_condition,
-            score_threshold=threshold
+            score_threshold=threshold,
+            query_text=query_text
         )
 
         return raw_results
+
+    async def get_neighbor_chunks(self, hits: List[Dict], window: int) -> List[Dict]:
+        return await self.embeddings_handler.get_neighbor_chunks(hits, window)
@@ -0,0 +1,193 @@
+import os
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+from app.config import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL_PATH,
+    EMBEDDING_ONNX_PATH,
+    EMBEDDING_ONNX_QUANTIZED,
+    RERANK_BACKEND,
+    RERANK_BATCH_SIZE,
+    RERANK_MODEL_PATH,
+    RERANK_ONNX_PATH,
+    RERANK_ONNX_QUANTIZED
+)
+from app.constants import (
+    EMBEDDING_MAX_SEQ_LENGTH,
+    EMBEDDING_MODEL_NAME,
+    ONNX_MODEL_FILE,
+    ONNX_QUANTIZED_MODEL_FILE,
+    RERANK_MAX_SEQ_LENGTH,
+    RERANK_MODEL_NAME
+)
+
+def _use_local_model(model_name: str):
+    if os.path.isdir(model_name):
+        # A pre-baked copy needs no hub round trips; must be set before transformers loads
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+def _onnx_session(model_dir: str, quantized: bool, threads: Optional[int]):
+    """CPU inference session for a model written by app.jobs.export_onnx_encoder."""
+    import onnxruntime
+
+    model_file = ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE
+    model_path = os.path.join(model_dir, model_file)
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(
+            f"No ONNX model at {model_path}; run app.jobs.export_onnx_encoder first"
+        )
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    # Worker processes pin their threads through OMP_NUM_THREADS; 0 lets ORT use every core
+    options.intra_op_num_threads = threads if threads is not None else int(os.environ.get("OMP_NUM_THREADS", "0"))
+    options.inter_op_num_threads = 1
+    return onnxruntime.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+def _onnx_inputs(session, encodings) -> dict:
+    inputs = {
+        "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+        "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)
+    }
+    input_names = {model_input.name for model_input in session.get_inputs()}
+    return {name: value for name, value in inputs.items() if name in input_names}
+
+class Encoder(ABC):
+    """Turns texts into embedding rows.
+
+    Rows may or may not be unit length (FlagModel normalizes, the ONNX CLS
+    output does not); EmbeddingService normalizes them either way.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        ...
+
+class TorchEncoder(Encoder):
+    """Reference backend: the PyTorch FlagModel in fp32."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_PATH or EMBEDDING_MODEL_NAME):
+        _use_local_model(model_name)
+        from FlagEmbedding import FlagModel
+
+        self.model = FlagModel(
+            model_name,
+            query_instruction_for_retrieval="Represent this sentence for searching relevant passages:",
+            use_fp16=False
+        )
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts), dtype=np.float32)
+
+class OnnxEncoder(Encoder):
+    """ONNX Runtime backend over a model exported by app.jobs.export_onnx_encoder.
+
+    Reproduces FlagModel's encoding: the same tokenizer with truncation at
+    EMBEDDING_MAX_SEQ_LENGTH and CLS pooling of the last hidden state.
+    """
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_dir: str = EMBEDDING_ONNX_PATH,
+        quantized: bool = EMBEDDING_ONNX_QUANTIZED,
+        threads: Optional[int] = None
+    ):
+        from tokenizers import Tokenizer
+
+        self.session = _onnx_session(model_dir, quantized, threads)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=EMBEDDING_MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        last_hidden_state = self.session.run(None, _onnx_inputs(self.session, encodings))[0]
+        return np.asarray(last_hidden_state[:, 0], dtype=np.float32)
+
+ENCODERS = {
+    TorchEncoder.name: TorchEncoder,
+    OnnxEncoder.name: OnnxEncoder
+}
+
+def create_encoder(backend: str = EMBEDDING_BACKEND) -> Encoder:
+    if backend not in ENCODERS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {sorted(ENCODERS)}")
+    print(f"Loading {backend} embedding encoder")
+    return ENCODERS[backend]()
+
+class CrossEncoder(ABC):
+    """Scores (query, passage) pairs; higher means more relevant."""
+
+    name = "base"
+
+    @abstractmethod
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        ...
+
+class TorchCrossEncoder(CrossEncoder):
+    """Reference reranker: FlagEmbedding's FlagReranker in fp32."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str = RERANK_MODEL_PATH or RERANK_MODEL_NAME):
+        _use_local_model(model_name)
+        from FlagEmbedding import FlagReranker
+
+        self.model = FlagReranker(model_name, use_fp16=False)
+
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        scores = self.model.compute_score(
+            [[query, passage] for passage in passages],
+            batch_size=RERANK_BATCH_SIZE,
+            max_length=RERANK_MAX_SEQ_LENGTH
+        )
+        return np.atleast_1d(np.asarray(scores, dtype=np.float32))
+
+class OnnxCrossEncoder(CrossEncoder):
+    """ONNX Runtime reranker exported with app.jobs.export_onnx_encoder --reranker."""
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_dir: str = RERANK_ONNX_PATH,
+        quantized: bool = RERANK_ONNX_QUANTIZED,
+        threads: Optional[int] = None
+    ):
+        from tokenizers import Tokenizer
+
+        self.session = _onnx_session(model_dir, quantized, threads)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=RERANK_MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+    def score(self, query: str, passages: List[str]) -> np.ndarray:
+        scores = []
+        for i in range(0, len(passages), RERANK_BATCH_SIZE):
+            encodings = self.tokenizer.encode_batch(
+                [(query, passage) for passage in passages[i:i + RERANK_BATCH_SIZE]]
+            )
+            logits = self.session.run(None, _onnx_inputs(self.session, encodings))[0]
+            scores.append(np.asarray(logits, dtype=np.float32).reshape(len(encodings), -1)[:, 0])
+        return np.concatenate(scores) if scores else np.zeros(0, dtype=np.float32)
+
+CROSS_ENCODERS = {
+    TorchCrossEncoder.name: TorchCrossEncoder,
+    OnnxCrossEncoder.name: OnnxCrossEncoder
+}
+
+def create_cross_encoder(backend: str = RERANK_BACKEND) -> CrossEncoder:
+    if backend not in CROSS_ENCODERS:
+        raise ValueError(f"Unknown rerank backend '{backend}', expected one of {sorted(CROSS_ENCODERS)}")
+    print(f"Loading {backend} reranker")
+    return CROSS_ENCODERS[backend]()
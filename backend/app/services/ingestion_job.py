@@ -0,0 +1,356 @@
+import asyncio
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from app.config import INGEST_BATCH_SIZE, INGEST_CONSUMERS
+from app.dbhandlers.embeddings_handler import EmbeddingsHandler
+from app.dbhandlers.job_store import JobStore
+from app.services.ingestion_scheduler import IngestionScheduler
+from app.services.semantic_cache import SemanticCache
+from app.utils.projects_utils import (
+    ChunkedTextFile,
+    chunk_content_hash,
+    chunk_point_id,
+    create_document_embedding,
+    embedding_consumer,
+    process_batch
+)
+
+class IngestionJob:
+    """One upload's ingestion run, with its own queue, consumers, stats and cancellation.
+
+    documents is either a list or a ChunkedTextFile read while the job runs.
+    Progress is persisted to the job store as a watermark: every chunk below
+    it has been stored, so a resumed job skips straight past them. Point ids
+    are deterministic, so chunks above the watermark are safely re-upserted.
+
+    In incremental mode the ids and content hashes already stored for the
+    source are fetched up front: unchanged chunks are skipped, chunks whose
+    text only moved reuse the stored vector, only new text is embedded, and
+    points for chunks that disappeared are deleted once the job succeeds.
+    """
+
+    def __init__(
+        self,
+        documents: Union[List[Dict], ChunkedTextFile],
+        custom_metadata: Optional[Dict],
+        embeddings_handler: EmbeddingsHandler,
+        scheduler: IngestionScheduler,
+        semantic_cache: SemanticCache,
+        job_store: JobStore,
+        job_id: Optional[str] = None,
+        source: Optional[str] = None,
+        watermark: int = 0,
+        incremental: bool = False
+    ):
+        self.id = job_id or uuid.uuid4().hex
+        self.documents = documents
+        self.custom_metadata = custom_metadata
+        self.embeddings_handler = embeddings_handler
+        self.scheduler = scheduler
+        self.semantic_cache = semantic_cache
+        self.job_store = job_store
+        self.source = source
+        self.incremental = incremental
+        self._total_chunks = len(documents) if isinstance(documents, list) else None
+
+        # Deep enough for every consumer to drain a full batch while the producer refills
+        self.embedding_queue = asyncio.Queue(maxsize=2 * INGEST_BATCH_SIZE * INGEST_CONSUMERS)
+        self.stop_event = asyncio.Event()
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.stats = {
+            'chunks_processed': 0,
+            'embeddings_generated': 0,
+            'stored_embeddings': 0,
+            'failed_embeddings': 0,
+            'failed_storage': 0,
+            'unchanged_chunks': 0,
+            'reused_embeddings': 0,
+            'deleted_stale': 0
+        }
+        self._existing: Dict[int, Optional[str]] = {}
+        self._existing_by_hash: Dict[str, int] = {}
+        self._seen_ids = set()
+        self._last_reused = []
+        self.resumed_from = watermark
+        self.watermark = watermark
+        self._stored_ahead = set()
+        self.started_at = time.time()
+        self.updated_at = self.started_at
+        self._suspending = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> 'IngestionJob':
+        self._save()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def wait(self) -> Dict[str, Any]:
+        """Wait for the job; a cancelled job still reports its partial result."""
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            if not self._task.cancelled():
+                raise
+        return self.result()
+
+    def cancel(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def suspend(self):
+        """Stop the job but leave it resumable, e.g. on shutdown."""
+        self._suspending = True
+        self.cancel()
+
+    @property
+    def done(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    @property
+    def total_chunks(self) -> Optional[int]:
+        """Exact once every document has been read, estimated before that"""
+        if self._total_chunks is not None:
+            return self._total_chunks
+        return self.documents.estimated_chunks
+
+    async def _iter_documents(self) -> AsyncIterator[Dict]:
+        if isinstance(self.documents, list):
+            for doc in self.documents:
+                yield doc
+        else:
+            async for doc in self.documents:
+                yield doc
+
+    def add_done_callback(self, callback):
+        self._task.add_done_callback(lambda _: callback(self))
+
+    def _on_stored(self, batch: List[Dict]):
+        self._stored_ahead.update(doc['chunk_number'] for doc in batch)
+        while self.watermark in self._stored_ahead:
+            self._stored_ahead.remove(self.watermark)
+            self.watermark += 1
+        self._save()
+
+    async def _run(self):
+        self.status = "running"
+        self._save()
+        self.scheduler.register(self.id)
+        consumers = [
+            asyncio.create_task(
+                embedding_consumer(
+                    self.custom_metadata,
+                    self.stats,
+                    self.embedding_queue,
+                    self.stop_event,
+                    self.scheduler,
+                    self.id,
+                    self.embeddings_handler,
+                    on_stored=self._on_stored
+                )
+            )
+            for _ in range(INGEST_CONSUMERS)
+        ]
+
+        try:
+            if self.incremental:
+                await self._load_existing()
+
+            # Chunks flow into the queue as they are read; its bound holds back the reader
+            batch_size = 50
+            batch, unchanged, reused = [], [], []
+            seen = 0
+            async for doc in self._iter_documents():
+                seen += 1
+                resumed = doc.get('chunk_number', 0) < self.resumed_from
+                if self.incremental:
+                    point_id = chunk_point_id(doc)
+                    self._seen_ids.add(point_id)
+                    if not resumed and point_id in self._existing:
+                        unchanged.append(doc)
+                        resumed = True
+                    elif not resumed and chunk_content_hash(doc['text']) in self._existing_by_hash:
+                        reused.append(doc)
+                        resumed = True
+                if resumed:
+                    if len(unchanged) == batch_size:
+                        await self._skip_unchanged(unchanged)
+                        unchanged = []
+                    if len(reused) == INGEST_BATCH_SIZE:
+                        batch.extend(await self._store_reused(reused))
+                        reused = []
+                    continue
+
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    await process_batch(batch, self.stats, self.embedding_queue)
+                    batch = []
+            await self._skip_unchanged(unchanged)
+            batch.extend(await self._store_reused(reused))
+            await process_batch(batch, self.stats, self.embedding_queue)
+            self._total_chunks = seen
+
+            self.stop_event.set()
+            last_batches = await asyncio.gather(*consumers)
+            await self.embeddings_handler.flush(
+                next((b for b in last_batches if b), self._last_reused)
+            )
+            if self.incremental:
+                await self._delete_stale()
+            self.status = "completed"
+        except asyncio.CancelledError:
+            self.status = "interrupted" if self._suspending else "cancelled"
+            raise
+        except Exception as e:
+            print(f"Ingestion job {self.id} failed: {str(e)}")
+            self.status = "failed"
+            self.error = str(e)
+        finally:
+            self.stop_event.set()
+            for consumer in consumers:
+                consumer.cancel()
+            await self.scheduler.unregister(self.id)
+            if self._total_chunks is None:
+                self._total_chunks = self.documents.estimated_chunks
+            self.documents = []
+            self._save()
+            if self.status != "interrupted":
+                self.job_store.remove_spool(self.id)
+
+            if self.stats['stored_embeddings'] or self.stats['deleted_stale']:
+                # Cached answers may now miss the newly ingested data
+                await self.semantic_cache.invalidate()
+
+    async def _load_existing(self):
+        if not self.source:
+            raise ValueError("Incremental ingestion needs a source")
+        self._existing = await self.embeddings_handler.get_source_hashes(self.source)
+        self._existing_by_hash = {
+            content_hash: point_id
+            for point_id, content_hash in self._existing.items()
+            if content_hash
+        }
+        print(f"Incremental ingestion of {self.source}: {len(self._existing)} points already stored")
+
+    async def _skip_unchanged(self, docs: List[Dict]):
+        if docs:
+            # Same text and chunk number, but earlier edits may have shifted it in the file
+            await self.embeddings_handler.set_positions({
+                chunk_point_id(doc): (doc.get('start_pos'), doc.get('end_pos')) for doc in docs
+            })
+            self.stats['unchanged_chunks'] += len(docs)
+            self._on_stored(docs)
+
+    async def _store_reused(self, docs: List[Dict]) -> List[Dict]:
+        """Store moved chunks under their new ids with their existing vectors.
+
+        Returns the chunks whose vector could not be fetched, to be embedded instead.
+        """
+        if not docs:
+            return []
+        old_ids = [self._existing_by_hash[chunk_content_hash(doc['text'])] for doc in docs]
+        vectors = await self.embeddings_handler.retrieve_vectors(old_ids)
+
+        embeddings, stored_docs, missing = [], [], []
+        for doc, old_id in zip(docs, old_ids):
+            if old_id in vectors:
+                embeddings.append(create_document_embedding(doc, vectors[old_id], self.custom_metadata))
+                stored_docs.append(doc)
+            else:
+                missing.append(doc)
+
+        result = await self.embeddings_handler.store_embeddings(embeddings, wait=False)
+        self.stats['reused_embeddings'] += result['stored']
+        self.stats['stored_embeddings'] += result['stored']
+        self.stats['failed_storage'] += result['failed']
+        if result['stored']:
+            self._last_reused = embeddings
+        if not result['failed']:
+            self._on_stored(stored_docs)
+        return missing
+
+    async def _delete_stale(self):
+        """Delete points for chunks no longer in the source, unless anything failed"""
+        if self.stats['failed_embeddings'] or self.stats['failed_storage']:
+            print(f"Ingestion job {self.id} had failures, keeping stale points of {self.source}")
+            return
+        stale = [point_id for point_id in self._existing if point_id not in self._seen_ids]
+        self.stats['deleted_stale'] = await self.embeddings_handler.delete_points(stale)
+
+    def _save(self):
+        self.updated_at = time.time()
+        try:
+            self.job_store.save(self.record())
+        except Exception as e:
+            print(f"Failed to persist ingestion job {self.id}: {str(e)}")
+
+    def record(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "source": self.source,
+            "custom_metadata": self.custom_metadata,
+            "total_chunks": self.total_chunks,
+            "watermark": self.watermark,
+            "resumed_from": self.resumed_from,
+            "incremental": self.incremental,
+            "stats": self.stats,
+            "error": self.error,
+            "started_at": self.started_at,
+            "updated_at": self.updated_at
+        }
+
+    def progress(self) -> Dict[str, Any]:
+        return job_progress(self.record())
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "job_id": self.id,
+            "stats": self.stats,
+            "error": self.error,
+            "message": (
+                f"Processed {self.stats['embeddings_generated']}/{(self.total_chunks or 0) - self.resumed_from} embeddings, "
+                f"stored {self.stats['stored_embeddings']}"
+            )
+        }
+
+def job_progress(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a job record into the progress report served by the jobs API."""
+    stats = record["stats"] or {}
+    stored = stats.get('stored_embeddings', 0)
+    unchanged = stats.get('unchanged_chunks', 0)
+    failed = stats.get('failed_embeddings', 0) + stats.get('failed_storage', 0)
+    total = record["total_chunks"] or 0
+    resumed_from = record["resumed_from"] or 0
+    running = record["status"] in ("pending", "running")
+
+    ended_at = time.time() if running else record["updated_at"]
+    elapsed = (ended_at or 0) - (record["started_at"] or 0)
+    rate = stored / elapsed if stored and elapsed > 0 else 0.0
+    remaining = max(total - resumed_from - unchanged - stored - failed, 0)
+    eta = remaining / rate if running and rate else None
+
+    return {
+        "job_id": record["id"],
+        "status": record["status"],
+        "source": record["source"],
+        "total_chunks": total,
+        "resumed_from": resumed_from,
+        "chunks_queued": stats.get('chunks_processed', 0),
+        "chunks_embedded": stats.get('embeddings_generated', 0),
+        "chunks_stored": stored,
+        "chunks_unchanged": unchanged,
+        "chunks_reused": stats.get('reused_embeddings', 0),
+        "chunks_deleted": stats.get('deleted_stale', 0),
+        "chunks_failed": failed,
+        "watermark": record["watermark"],
+        "incremental": bool(record.get("incremental")),
+        "chunks_per_second": round(rate, 2),
+        "eta_seconds": round(eta, 1) if eta is not None else None,
+        "error": record["error"],
+        "started_at": record["started_at"],
+        "updated_at": record["updated_at"]
+    }
@@ -0,0 +1,80 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+import numpy as np
+
+from app.config import INGEST_MAX_CONCURRENCY
+from app.services.embedding_process_pool import EmbeddingProcessPool
+from app.services.embeddings_service import EmbeddingService
+
+class IngestionScheduler:
+    """Caps embedding work across all ingestion jobs and splits it fairly between them.
+
+    At most max_concurrency batches are encoded at once, on an executor
+    separate from the chat path's embedding worker, and each running job is
+    limited to an equal share of those slots. With a process pool, batches
+    are encoded there and each worker process is one slot.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = INGEST_MAX_CONCURRENCY,
+        process_pool: Optional[EmbeddingProcessPool] = None
+    ):
+        self.process_pool = process_pool
+        if process_pool is not None:
+            max_concurrency = process_pool.processes
+        self.max_concurrency = max(1, max_concurrency)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="ingestion"
+        )
+        self._in_flight = 0
+        self._per_job: Dict[str, int] = {}
+        self._condition = asyncio.Condition()
+
+    def register(self, job_id: str):
+        self._per_job.setdefault(job_id, 0)
+
+    async def unregister(self, job_id: str):
+        async with self._condition:
+            self._per_job.pop(job_id, None)
+            # A job leaving raises everyone else's share
+            self._condition.notify_all()
+
+    def _fair_share(self) -> int:
+        return max(1, self.max_concurrency // max(1, len(self._per_job)))
+
+    def _can_run(self, job_id: str) -> bool:
+        return (
+            self._in_flight < self.max_concurrency
+            and self._per_job.get(job_id, 0) < self._fair_share()
+        )
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        if self.process_pool is not None:
+            return await self.process_pool.encode(texts)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, EmbeddingService.encode_texts, texts)
+
+    @asynccontextmanager
+    async def slot(self, job_id: str):
+        """Hold one embedding slot for job_id, yielding the encode function to use in it."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._can_run(job_id))
+            self._in_flight += 1
+            self._per_job[job_id] = self._per_job.get(job_id, 0) + 1
+        try:
+            yield self.encode
+        finally:
+            async with self._condition:
+                self._in_flight -= 1
+                if job_id in self._per_job:
+                    self._per_job[job_id] -= 1
+                self._condition.notify_all()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.process_pool is not None:
+            self.process_pool.close()
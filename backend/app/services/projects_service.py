@@ -1,17 +1,156 @@
-from concurrent.futures import ThreadPoolExecutor
-from fastapi import HTTPException
-from typing import Dict, Any, List, Optional
 import asyncio
+import codecs
+import os
+import uuid
+from fastapi import HTTPException, UploadFile
+from typing import Dict, Any, List, Optional, Union
+
+from app.config import INGEST_READ_SIZE
 
 from app.dbhandlers.embeddings_handler import EmbeddingsHandler
-from app.utils.projects_utils import embedding_consumer, process_batch
+from app.dbhandlers.job_store import JobStore
+from app.services.embedding_process_pool import EmbeddingProcessPool
+from app.services.ingestion_job import IngestionJob, job_progress
+from app.services.ingestion_scheduler import IngestionScheduler
+from app.services.semantic_cache import SemanticCache
+from app.utils.projects_utils import ChunkedTextFile
+
+def _spool_block(spool, decoder: codecs.IncrementalDecoder, data: bytes):
+    """Check that a block continues valid UTF-8, then append it to the spool."""
+    decoder.decode(data)
+    spool.write(data)
+
+class ProjectsService:
+    def __init__(
+        self,
+        embeddings_handler: EmbeddingsHandler,
+        semantic_cache: SemanticCache,
+        job_store: JobStore,
+        embedding_pool: Optional[EmbeddingProcessPool] = None
+    ):
+        self.embeddings_handler = embeddings_handler
+        self.semantic_cache = semantic_cache
+        self.job_store = job_store
+        self.scheduler = IngestionScheduler(process_pool=embedding_pool)
+        self.jobs: Dict[str, IngestionJob] = {}
+
+    async def close(self):
+        """Suspend running jobs so they resume on the next start, then join the workers."""
+        jobs = list(self.jobs.values())
+        for job in jobs:
+            job.suspend()
+        for job in jobs:
+            await job.wait()
+        self.scheduler.close()
+
+    def submit(
+        self,
+        documents: Union[List[Dict], ChunkedTextFile],
+        custom_metadata: Optional[Dict] = None,
+        job_id: Optional[str] = None,
+        source: Optional[str] = None,
+        watermark: int = 0,
+        incremental: bool = False
+    ) -> IngestionJob:
+        """Start ingesting documents as an independent job"""
+        if not isinstance(documents, ChunkedTextFile) and (not documents or not isinstance(documents, list)):
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid documents format - expected list"
+            )
+        if incremental and not source:
+            raise HTTPException(
+                status_code=400,
+                detail="Incremental ingestion needs a source"
+            )
+
+        job = IngestionJob(
+            documents,
+            custom_metadata,
+            self.embeddings_handler,
+            self.scheduler,
+            self.semantic_cache,
+            self.job_store,
+            job_id=job_id,
+            source=source,
+            watermark=watermark,
+            incremental=incremental
+        )
+        self.jobs[job.id] = job
+        job.start().add_done_callback(lambda done: self.jobs.pop(done.id, None))
+        return job
+
+    async def ingest_upload(
+        self,
+        upload: UploadFile,
+        custom_metadata: Optional[Dict] = None,
+        incremental: bool = False
+    ) -> IngestionJob:
+        """Spool an upload to disk piece by piece and start a job that chunks it as it reads.
+
+        With incremental, only chunks that changed since the file was last
+        ingested are embedded and chunks that disappeared are deleted.
+        """
+        job_id = uuid.uuid4().hex
+        spool_path = self.job_store.spool_path(job_id)
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        try:
+            # Disk writes and UTF-8 checks run off the event loop; uploads can be hundreds of MB
+            spool = await asyncio.to_thread(open, spool_path, "wb")
+            try:
+                while data := await upload.read(INGEST_READ_SIZE):
+                    await asyncio.to_thread(_spool_block, spool, decoder, data)
+            finally:
+                await asyncio.to_thread(spool.close)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            self.job_store.remove_spool(job_id)
+            raise HTTPException(status_code=400, detail="File is not valid UTF-8 text")
+        except Exception:
+            self.job_store.remove_spool(job_id)
+            raise
+
+        documents = ChunkedTextFile(spool_path, upload.filename)
+        return self.submit(
+            documents,
+            custom_metadata,
+            job_id=job_id,
+            source=upload.filename,
+            incremental=incremental
+        )
+
+    async def resume(self):
+        """Restart jobs interrupted by a shutdown or crash from their last stored chunk"""
+        for record in self.job_store.resumable():
+            spool_path = self.job_store.spool_path(record["id"])
+            if not os.path.exists(spool_path):
+                record.update(status="failed", error="Upload spool missing, cannot resume")
+                self.job_store.save(record)
+                continue
+
+            print(f"Resuming ingestion job {record['id']} from chunk {record['watermark']}")
+            self.submit(
+                ChunkedTextFile(spool_path, record["source"]),
+                record["custom_metadata"],
+                job_id=record["id"],
+                source=record["source"],
+                watermark=record["watermark"],
+                incremental=bool(record.get("incremental"))
+            )
 
-class ProjectsService:  
-    def __init__(self):
-        self.embeddings_handler = EmbeddingsHandler()
-        self.executor = ThreadPoolExecutor(max_workers=8)
-        self.embedding_queue = asyncio.Queue(maxsize=100)
-        self.stop_event = asyncio.Event()
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.progress()
+        record = self.job_store.get(job_id)
+        return job_progress(record) if record else None
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancel()
+        return True
 
     async def create(
         self,
@@ -19,58 +158,26 @@ class ProjectsService:
         custom_metadata: Optional[Dict] = None
     ) -> Dict[str, Any]:
         """Generate and store embeddings for text chunks"""
+        return await self.finish(self.submit(documents, custom_metadata))
+
+    async def finish(self, job: IngestionJob) -> Dict[str, Any]:
+        """Wait for a job and raise if it failed; a completed job reports status "success"."""
         try:
-            if not documents or not isinstance(documents, list):
+            result = await job.wait()
+            if result["status"] == "failed":
                 raise HTTPException(
-                    status_code=400,
-                    detail="Invalid documents format - expected list"
-                )
-
-            total_docs = len(documents)
-            stats = {
-                'chunks_processed': 0,
-                'embeddings_generated': 0,
-                'stored_embeddings': 0,
-                'failed_embeddings': 0,
-                'failed_storage': 0
-            }
-
-            consumers = [
-                asyncio.create_task(
-                    embedding_consumer(
-                        custom_metadata, 
-                        stats,
-                        self.embedding_queue,
-                        self.stop_event,
-                        self.executor,
-                        self.embeddings_handler
-                    )
-                )
-                for _ in range(4)
-            ]
-
-            batch_size = 50
-            for i in range(0, total_docs, batch_size):
-                batch = documents[i:i + batch_size]
-                await process_batch(
-                    batch, 
-                    stats, 
-                    self.embedding_queue
+                    status_code=500,
+                    detail=f"Project processing failed: {result['error']}"
                 )
-                
-            self.stop_event.set()
-            await asyncio.gather(*consumers)
-
-            return {
-                "status": "success",
-                "stats": stats,
-                "message": f"Processed {stats['embeddings_generated']}/{total_docs} embeddings, stored {stats['stored_embeddings']}"
-            }
+            if result["status"] == "completed":
+                # Synchronous callers have always been answered with "success"
+                result["status"] = "success"
+            return result
         except HTTPException:
-            raise 
+            raise
         except Exception as error:
             print(f"Critical error in project creation: {error}")
             raise HTTPException(
                 status_code=500,
                 detail=f"Project processing failed: {str(error)}"
-            )
\ No newline at end of file
+            )
@@ -0,0 +1,71 @@
+from cachetools import TTLCache
+from typing import Any, Dict
+
+from app.config import QUOTA_CACHE_TTL, QUOTA_CACHE_MAX_USERS
+from app.constants import FREE_MESSAGE_LIMIT
+from app.external_services.db import DB
+
+class QuotaService:
+    """Per-user message quota from a counter on the user document.
+
+    The counter is bumped with an atomic $inc as each message is stored, so
+    checking a quota never scans the messages collection. Quotas are cached
+    in-process for QUOTA_CACHE_TTL and refreshed from the $inc result, so
+    this instance's writes are never stale. Quotas that have reached the
+    limit are never cached, so a refusal always re-reads the user document
+    and sees a payment made through any instance.
+    """
+
+    def __init__(
+        self,
+        db: DB,
+        ttl: float = QUOTA_CACHE_TTL,
+        max_users: int = QUOTA_CACHE_MAX_USERS
+    ):
+        self.db = db
+        self.cache: TTLCache = TTLCache(maxsize=max_users, ttl=ttl)
+
+    async def get_quota(self, user_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Load (or create) the user and work out where they stand against the free limit."""
+        user_id = user_info.get("id")
+        quota = self.cache.get(user_id)
+        if quota is not None:
+            return quota
+
+        user = await self.db.get_user(user_id)
+        if user is None:
+            user = await self.db.create_user(user_id, user_info.get("email"), user_info.get("name"))
+        return await self.quota_for_user(user)
+
+    async def quota_for_user(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """Quota from an already loaded user document."""
+        msg_count = user.get("message_count")
+        if msg_count is None:
+            msg_count = await self.db.init_message_count(user["user_id"])
+        return self._remember(user["user_id"], user.get("free", True), user.get("paid", False), msg_count)
+
+    async def record_message(self, quota: Dict[str, Any]) -> Dict[str, Any]:
+        """Count a stored message against the user's quota."""
+        msg_count = await self.db.increment_message_count(quota["user_id"])
+        if msg_count is None:
+            await self.db.init_message_count(quota["user_id"])
+            msg_count = await self.db.increment_message_count(quota["user_id"]) or 0
+        return self._remember(quota["user_id"], quota["free"], quota["paid"], msg_count)
+
+    async def set_paid(self, user_id: str):
+        await self.db.set_user_paid(user_id)
+        self.cache.pop(user_id, None)
+
+    def _remember(self, user_id: str, free: bool, paid: bool, msg_count: int) -> Dict[str, Any]:
+        quota = {
+            "user_id": user_id,
+            "free": free,
+            "paid": paid,
+            "msg_count": msg_count,
+            "limit_reached": free and not paid and msg_count >= FREE_MESSAGE_LIMIT
+        }
+        if quota["limit_reached"]:
+            self.cache.pop(user_id, None)
+        else:
+            self.cache[user_id] = quota
+        return quota
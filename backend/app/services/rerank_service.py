@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.config import (
+    RERANK_ENABLED,
+    RERANK_CANDIDATES,
+    RERANK_TOP_K,
+    RERANK_TIME_BUDGET_MS
+)
+from app.services.encoders import CrossEncoder, create_cross_encoder
+
+class RerankService:
+    """Reorders retrieved chunks with a cross-encoder under a per-request time budget.
+
+    Scoring runs on one dedicated thread so it never competes with itself.
+    A request whose scores are not back within RERANK_TIME_BUDGET_MS keeps
+    the retrieval order: cosine, or RRF in hybrid mode. Its scoring still
+    finishes in the background, because a running forward pass cannot be
+    interrupted.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = RERANK_ENABLED,
+        candidates: int = RERANK_CANDIDATES,
+        top_k: int = RERANK_TOP_K,
+        time_budget_ms: float = RERANK_TIME_BUDGET_MS
+    ):
+        self.enabled = enabled
+        self.candidates = max(1, candidates)
+        self.top_k = max(1, top_k)
+        self.time_budget = time_budget_ms / 1000
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self.stats = {"reranked": 0, "timeouts": 0, "errors": 0}
+        self._model: Optional[CrossEncoder] = None
+        self._model_lock = threading.Lock()
+
+    def _get_model(self) -> CrossEncoder:
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = create_cross_encoder()
+        return self._model
+
+    def _score(self, query: str, passages: List[str]) -> List[float]:
+        return self._get_model().score(query, passages).tolist()
+
+    async def warm_up(self):
+        """Load the model ahead of the first request, which would otherwise time out on it."""
+        if not self.enabled:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self.executor, self._score, "warm up", ["warm up"])
+        except Exception as e:
+            print(f"Reranker failed to load, reranking disabled: {str(e)}")
+            self.enabled = False
+
+    async def rerank(self, query: str, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Best top_k of the highest-scoring candidates, or chunks unchanged when disabled."""
+        if not self.enabled or not chunks:
+            return chunks
+
+        ranked = sorted(chunks, key=lambda chunk: chunk.get("score") or 0.0, reverse=True)
+        candidates = ranked[:self.candidates]
+        passages = [chunk.get("metadata", {}).get("text", "") for chunk in candidates]
+
+        loop = asyncio.get_running_loop()
+        try:
+            scores = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, self._score, query, passages),
+                timeout=self.time_budget
+            )
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            print(f"Rerank exceeded {self.time_budget * 1000:.0f}ms, keeping retrieval order")
+            return candidates[:self.top_k]
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Rerank failed, keeping retrieval order: {str(e)}")
+            return candidates[:self.top_k]
+
+        self.stats["reranked"] += 1
+        order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+        return [candidates[i] for i in order[:self.top_k]]
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,431 @@
+import time
+import uuid
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from fastapi.encoders import jsonable_encoder
+from qdrant_client.http import models
+
+from app.config import (
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_BACKEND,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_GENERATION_CHECK_INTERVAL
+)
+from app.constants import SEMANTIC_CACHE_COLLECTION_NAME, SEMANTIC_CACHE_STATE_COLLECTION_NAME
+from app.external_services.qdrant_pool import QdrantClientPool
+
+class InMemorySemanticIndex:
+    """Brute-force cosine index over a fixed number of slots with LRU eviction.
+
+    The cache is small enough that one matrix-vector product beats maintaining
+    a graph index, and it keeps eviction trivial.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._matrix: Optional[np.ndarray] = None
+        self._valid = np.zeros(self.max_entries, dtype=bool)
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    async def search(self, vector: np.ndarray, threshold: float, generation: int) -> Optional[Dict[str, Any]]:
+        if self._matrix is None or not self._entries or vector.shape[0] != self._matrix.shape[1]:
+            return None
+
+        scores = self._matrix @ vector
+        scores[~self._valid] = -np.inf
+        now = time.monotonic()
+        while True:
+            slot = int(np.argmax(scores))
+            if scores[slot] < threshold:
+                return None
+
+            entry = self._entries[slot]
+            if entry["generation"] >= generation and entry["expires_at"] > now:
+                self._entries.move_to_end(slot)
+                return entry["response"]
+
+            # A stale best match must not hide a valid one just below it
+            if entry["expires_at"] <= now:
+                self.expirations += 1
+            self._remove(slot)
+            scores[slot] = -np.inf
+
+    async def put(self, vector: np.ndarray, response: Dict[str, Any], threshold: float, generation: int):
+        if self._matrix is None or vector.shape[0] != self._matrix.shape[1]:
+            self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            self._valid[:] = False
+            self._entries.clear()
+
+        slot = self._slot_for(vector, threshold)
+        self._matrix[slot] = vector
+        self._valid[slot] = True
+        self._entries[slot] = {
+            "response": response,
+            "generation": generation,
+            "expires_at": time.monotonic() + self.ttl
+        }
+        self._entries.move_to_end(slot)
+
+    def _slot_for(self, vector: np.ndarray, threshold: float) -> int:
+        """Reuse a near-duplicate's slot, then a free one, then the least recently used."""
+        if self._entries:
+            scores = self._matrix @ vector
+            scores[~self._valid] = -np.inf
+            slot = int(np.argmax(scores))
+            if scores[slot] >= threshold:
+                return slot
+
+        free = np.flatnonzero(~self._valid)
+        if free.size:
+            return int(free[0])
+
+        slot, _ = self._entries.popitem(last=False)
+        self._valid[slot] = False
+        self.evictions += 1
+        return slot
+
+    def _remove(self, slot: int):
+        self._entries.pop(slot, None)
+        self._valid[slot] = False
+
+    async def drop_before(self, generation: int):
+        for slot in [slot for slot, entry in self._entries.items() if entry["generation"] < generation]:
+            self._remove(slot)
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+class QdrantSemanticIndex:
+    """Cache entries kept in a dedicated Qdrant collection, shared by every worker."""
+
+    def __init__(self, pool: QdrantClientPool, max_entries: int, ttl: float):
+        self.pool = pool
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.vector_size: Optional[int] = None
+        self.evictions = 0
+        self.expirations = 0
+
+    async def _ensure_collection(self, vector_size: int):
+        if self.vector_size == vector_size:
+            return
+        client = self.pool.client()
+        if not await client.collection_exists(collection_name=SEMANTIC_CACHE_COLLECTION_NAME):
+            await client.create_collection(
+                collection_name=SEMANTIC_CACHE_COLLECTION_NAME,
+                vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE)
+            )
+            for field_name in ("expires_at", "last_hit"):
+                await client.create_payload_index(
+                    collection_name=SEMANTIC_CACHE_COLLECTION_NAME,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.FLOAT
+                )
+        # Idempotent, and also reaches collections created before entries carried a generation
+        await client.create_payload_index(
+            collection_name=SEMANTIC_CACHE_COLLECTION_NAME,
+            field_name="generation",
+            field_schema=models.PayloadSchemaType.INTEGER
+        )
+        self.vector_size = vector_size
+
+    async def search(self, vector: np.ndarray, threshold: float, generation: int) -> Optional[Dict[str, Any]]:
+        try:
+            return await self._search(vector, threshold, generation)
+        except Exception:
+            # Re-check the collection next time, in case it was dropped from under us
+            self.vector_size = None
+            raise
+
+    async def _search(self, vector: np.ndarray, threshold: float, generation: int) -> Optional[Dict[str, Any]]:
+        await self._ensure_collection(vector.shape[0])
+        client = self.pool.client()
+        now = time.time()
+        result = await client.query_points(
+            collection_name=SEMANTIC_CACHE_COLLECTION_NAME,
+            query=vector.tolist(),
+            limit=1,
+            score_threshold=threshold,
+            query_filter=models.Filter(
+                must=[
+                    models.FieldCondition(key="expires_at", range=models.Range(gt=now)),
+                    models.FieldCondition(key="generation", range=models.Range(gte=generation))
+                ]
+            ),
+            with_payload=True
+        )
+        if not result.points:
+            return None
+
+        point = result.points[0]
+        await client.set_payload(
+            collection_name=SEMANTIC_CACHE_COLLECTION_NAME,
+            payload={"last_hit": now},
+            points=[point.id],
+            wait=False
+        )
+        return point.payload["response"]
+
+    async def put(self, vector: np.ndarray, response: Dict[str, Any], threshold: float, generation: int):
+        try:
+            await self._put(vector, response, threshold, generation)
+        except Exception:
+            self.vector_size = None
+            raise
+
+    async def _put(self, vector: np.ndarray, response: Dict[str, Any], threshold: float, generation: int):
+        await self._ensure_collection(vector.shape[0])
+        client = self.pool.client()
+        now = time.time()
+        await client.upsert(
+            collection_name=SEMANTIC_CACHE_COLLECTION_NAME,
+            points=[
+                models.PointStruct(
+                    id=str(uuid.uuid4()),
+                    vector=vector.tolist(),
+                    payload={
+                        "response": response,
+                        "generation": generation,
+                        "expires_at": now + self.ttl,
+                        "last_hit": now
+                    }
+                )
+            ],
+            wait=True
+        )
+        await self._evict(now)
+
+    async def _evict(self, now: float):
+        client = self.pool.client()
+        expired = models.Filter(
+            must=[models.FieldCondition(key="expires_at", range=models.Range(lte=now))]
+        )
+        expired_count = (await client.count(
+            collection_name=SEMANTIC_CACHE_COLLECTION_NAME, count_filter=expired, exact=True
+        )).count
+        if expired_count:
+            await client.delete(
+                collection_name=SEMANTIC_CACHE_COLLECTION_NAME,
+                points_selector=models.FilterSelector(filter=expired),
+                wait=False
+            )
+            self.expirations += expired_count
+
+        excess = await self.size() - expired_count - self.max_entries
+        if excess > 0:
+            records, _ = await client.scroll(
+                collection_name=SEMANTIC_CACHE_COLLECTION_NAME,
+                limit=excess,
+                order_by=models.OrderBy(key="last_hit", direction=models.Direction.ASC),
+                with_payload=False
+            )
+            await client.delete(
+                collection_name=SEMANTIC_CACHE_COLLECTION_NAME,
+                points_selector=models.PointIdsList(points=[record.id for record in records]),
+                wait=False
+            )
+            self.evictions += len(records)
+
+    async def drop_before(self, generation: int):
+        """Delete older entries; the collection itself stays, since other workers use it."""
+        client = self.pool.client()
+        if not await client.collection_exists(collection_name=SEMANTIC_CACHE_COLLECTION_NAME):
+            return
+        await client.delete(
+            collection_name=SEMANTIC_CACHE_COLLECTION_NAME,
+            points_selector=models.FilterSelector(
+                filter=models.Filter(
+                    must=[models.FieldCondition(key="generation", range=models.Range(lt=generation))]
+                )
+            ),
+            wait=False
+        )
+
+    async def size(self) -> int:
+        if self.vector_size is None:
+            return 0
+        return (await self.pool.client().count(
+            collection_name=SEMANTIC_CACHE_COLLECTION_NAME, exact=True
+        )).count
+
+class SharedGeneration:
+    """Cache generation kept in Qdrant, so an invalidation reaches every worker.
+
+    Workers re-read it at most every SEMANTIC_CACHE_GENERATION_CHECK_INTERVAL.
+    Without a pool the generation is local to this process.
+    """
+
+    _POINT_ID = 0
+
+    def __init__(
+        self,
+        pool: Optional[QdrantClientPool],
+        check_interval: float = SEMANTIC_CACHE_GENERATION_CHECK_INTERVAL
+    ):
+        self.pool = pool
+        self.check_interval = check_interval
+        self.value = 0
+        self._checked_at = float("-inf")
+        self._collection_ready = False
+
+    async def _ensure_collection(self):
+        if self._collection_ready:
+            return
+        client = self.pool.client()
+        if not await client.collection_exists(collection_name=SEMANTIC_CACHE_STATE_COLLECTION_NAME):
+            await client.create_collection(
+                collection_name=SEMANTIC_CACHE_STATE_COLLECTION_NAME,
+                vectors_config=models.VectorParams(size=1, distance=models.Distance.DOT)
+            )
+        self._collection_ready = True
+
+    async def _read(self) -> int:
+        await self._ensure_collection()
+        records = await self.pool.client().retrieve(
+            collection_name=SEMANTIC_CACHE_STATE_COLLECTION_NAME,
+            ids=[self._POINT_ID],
+            with_payload=True
+        )
+        return int(records[0].payload.get("generation", 0)) if records else 0
+
+    async def get(self) -> int:
+        if self.pool is None or time.monotonic() - self._checked_at < self.check_interval:
+            return self.value
+        self.value = max(self.value, await self._read())
+        self._checked_at = time.monotonic()
+        return self.value
+
+    async def advance(self) -> int:
+        """Start a new generation. Concurrent advances may share one, which still invalidates."""
+        if self.pool is None:
+            self.value += 1
+            return self.value
+        self.value = max(self.value, await self._read()) + 1
+        await self.pool.client().upsert(
+            collection_name=SEMANTIC_CACHE_STATE_COLLECTION_NAME,
+            points=[
+                models.PointStruct(id=self._POINT_ID, vector=[1.0], payload={"generation": self.value})
+            ],
+            wait=True
+        )
+        self._checked_at = time.monotonic()
+        return self.value
+
+class SemanticCache:
+    """Returns a stored agent response when a new query embeds close to a cached one."""
+
+    def __init__(
+        self,
+        pool: Optional[QdrantClientPool] = None,
+        enabled: bool = SEMANTIC_CACHE_ENABLED,
+        backend: str = SEMANTIC_CACHE_BACKEND,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES
+    ):
+        self.enabled = enabled
+        self.threshold = threshold
+        if backend == "qdrant":
+            if pool is None:
+                raise ValueError("The qdrant semantic cache backend needs a QdrantClientPool")
+            self.index = QdrantSemanticIndex(pool, max_entries, ttl)
+        else:
+            self.index = InMemorySemanticIndex(max_entries, ttl)
+
+        # Bumped on invalidation, by any worker, so responses computed against old
+        # data are neither served nor stored
+        self.shared_generation = SharedGeneration(pool)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    async def _refresh_generation(self) -> int:
+        """Pick up invalidations made by other workers and drop what they made stale."""
+        try:
+            generation = await self.shared_generation.get()
+        except Exception as e:
+            print(f"Semantic cache generation check failed: {str(e)}")
+            self.errors += 1
+            return self.generation
+        if generation > self.generation:
+            self.generation = generation
+            await self.index.drop_before(generation)
+        return self.generation
+
+    async def lookup(self, vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Cached response for the query, if any; also refreshes `generation` for a later store."""
+        if not self.enabled:
+            return None
+        try:
+            generation = await self._refresh_generation()
+            response = await self.index.search(self._normalize(vector), self.threshold, generation)
+        except Exception as e:
+            print(f"Semantic cache lookup failed: {str(e)}")
+            self.errors += 1
+            response = None
+
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    async def store(self, vector: np.ndarray, response: Dict[str, Any], generation: int):
+        if not self.enabled:
+            return
+        try:
+            if generation != await self._refresh_generation():
+                return
+            await self.index.put(
+                self._normalize(vector), jsonable_encoder(response), self.threshold, generation
+            )
+            self.stores += 1
+        except Exception as e:
+            print(f"Semantic cache store failed: {str(e)}")
+            self.errors += 1
+
+    async def invalidate(self):
+        """Drop every cached response, in every worker, e.g. after new data is ingested."""
+        self.invalidations += 1
+        try:
+            self.generation = max(self.generation, await self.shared_generation.advance())
+        except Exception as e:
+            print(f"Semantic cache generation update failed: {str(e)}")
+            self.errors += 1
+            self.generation += 1
+        try:
+            await self.index.drop_before(self.generation)
+        except Exception as e:
+            print(f"Semantic cache invalidation failed: {str(e)}")
+            self.errors += 1
+
+    async def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.index).__name__,
+            "size": await self.index.size() if self.enabled else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.index.evictions,
+            "expirations": self.index.expirations,
+            "invalidations": self.invalidations,
+            "errors": self.errors
+        }
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import (
+    WRITE_BEHIND_MAX_PENDING,
+    WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_FLUSH_INTERVAL,
+    WRITE_BEHIND_ENQUEUE_TIMEOUT
+)
+from app.external_services.db import DB
+from app.models.db.message import Message
+
+MESSAGE = "message"
+TRACKING = "tracking"
+_STOP = object()
+
+class WriteBehindBuffer:
+    """Queues message documents and tracking events and persists them in batches.
+
+    Callers only enqueue. A background flusher drains the queue whenever
+    WRITE_BEHIND_BATCH_SIZE items are waiting or WRITE_BEHIND_FLUSH_INTERVAL
+    has passed since the first one arrived, writing messages with one
+    insert_many and tracking events with one Firebase update. When the
+    queue is full, enqueueing waits up to WRITE_BEHIND_ENQUEUE_TIMEOUT for
+    room and then drops the item rather than stall the request.
+    """
+
+    def __init__(
+        self,
+        db: DB,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+        enqueue_timeout: float = WRITE_BEHIND_ENQUEUE_TIMEOUT
+    ):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_pending))
+        self.closed = False
+        self.stats = {"written_messages": 0, "written_tracking": 0, "dropped": 0, "failed": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def store_message(self, user_id: str, user_message: str, agent_message: str):
+        message = Message(user_id=user_id, user_message=user_message, agent_message=agent_message)
+        await self._enqueue(MESSAGE, message.model_dump())
+
+    async def track_message(self, response: Dict[str, Any]):
+        await self._enqueue(TRACKING, (DB.tracking_key(), response))
+
+    async def _enqueue(self, kind: str, item: Any):
+        if self.closed:
+            print(f"Write-behind buffer is closed, dropping {kind}")
+            self.stats["dropped"] += 1
+            return
+        try:
+            self.queue.put_nowait((kind, item))
+            return
+        except asyncio.QueueFull:
+            pass
+        try:
+            await asyncio.wait_for(self.queue.put((kind, item)), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            print(f"Write-behind buffer full, dropping {kind}")
+            self.stats["dropped"] += 1
+
+    async def _next_batch(self) -> Tuple[List[Tuple[str, Any]], bool]:
+        """Wait for one item, then collect more until the batch fills or the interval ends.
+
+        The flag is True once close() has queued its stop marker.
+        """
+        batch = []
+        item = await self.queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while item is not _STOP:
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or remaining <= 0:
+                return batch, False
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return batch, False
+        return batch, True
+
+    def _drain_batch(self) -> List[Tuple[str, Any]]:
+        batch = []
+        while len(batch) < self.batch_size and not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not _STOP:
+                batch.append(item)
+        return batch
+
+    async def _flush_loop(self):
+        stop = False
+        while not stop:
+            batch, stop = await self._next_batch()
+            if batch:
+                await self._write(batch)
+
+    async def _write(self, batch: List[Tuple[str, Any]]):
+        messages = [item for kind, item in batch if kind == MESSAGE]
+        tracking = dict(item for kind, item in batch if kind == TRACKING)
+        results = await asyncio.gather(
+            self.db.store_messages(messages),
+            self.db.track_messages(tracking),
+            return_exceptions=True
+        )
+        for name, items, result in (("messages", messages, results[0]), ("tracking", tracking, results[1])):
+            if isinstance(result, Exception):
+                print(f"Error writing {len(items)} {name}: {str(result)}")
+                self.stats["failed"] += len(items)
+            else:
+                self.stats[f"written_{name}"] += len(items)
+
+    async def close(self):
+        """Stop accepting items and write out everything still queued."""
+        self.closed = True
+        if self._task is not None:
+            # The marker queues behind pending items, so the flusher writes them all first
+            await self.queue.put(_STOP)
+            await self._task
+            self._task = None
+        while not self.queue.empty():
+            batch = self._drain_batch()
+            if batch:
+                await self._write(batch)
+        print(f"Write-behind buffer drained: {self.stats}")
@@ -1,4 +1,7 @@
+from fastapi import Request
+
 from app.custom_fastapi import CustmFastAPI
 
-def get_app():
-    return CustmFastAPI()
\ No newline at end of file
+def get_app(request: Request) -> CustmFastAPI:
+    """Dependency returning the running app and its shared services."""
+    return request.app
@@ -0,0 +1,123 @@
+import math
+from typing import Any, Dict, List, Optional
+
+from app.config import CONTEXT_TOKEN_BUDGET, CONTEXT_CHARS_PER_TOKEN
+
+class ContextAssembler:
+    """Turn retrieved chunks into prompt context under a token budget.
+
+    Chunks are expected most relevant first. Chunks of the same source whose
+    start_pos/end_pos ranges overlap or touch are merged into one span, so
+    the chunker's overlap is sent once. Spans are then packed greedily in
+    order of their best chunk's rank, skipping any that no longer fit; a
+    merged span that is too large is retried as its separate chunks.
+    Chunks stored without positions are deduplicated by text only.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        chars_per_token: float = CONTEXT_CHARS_PER_TOKEN
+    ):
+        self.token_budget = token_budget
+        self.chars_per_token = chars_per_token
+
+    def estimate_tokens(self, text: str) -> int:
+        """Character-based estimate; close enough for budgeting and costs nothing."""
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def assemble(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Spans to send, most relevant first, each with its text and the chunks it covers."""
+        spans = sorted(self._spans(chunks), key=lambda span: span["rank"])
+
+        packed, used = [], 0
+        queue = list(spans)
+        while queue:
+            span = queue.pop(0)
+            # One extra token for the separator between spans
+            tokens = self.estimate_tokens(span["text"]) + 1
+            if used + tokens <= self.token_budget:
+                packed.append(span)
+                used += tokens
+            elif len(span["chunks"]) > 1:
+                # Too big merged; its best chunks alone may still fit
+                queue.extend(self._unmerged(span))
+                queue.sort(key=lambda span: span["rank"])
+
+        if not packed and spans:
+            span = spans[0]
+            span["text"] = span["text"][:int(self.token_budget * self.chars_per_token)]
+            packed.append(span)
+
+        print(f"Context: {len(chunks)} chunks, {len(spans)} spans, {len(packed)} packed (~{used} tokens)")
+        return packed
+
+    @staticmethod
+    def _unmerged(span: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [
+            {"text": chunk["metadata"]["text"], "rank": rank, "ranks": [rank], "chunks": [chunk]}
+            for chunk, rank in zip(span["chunks"], span["ranks"])
+        ]
+
+    def _spans(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        by_source: Dict[str, List[Dict[str, Any]]] = {}
+        spans, seen_texts = [], set()
+
+        for rank, chunk in enumerate(chunks):
+            metadata = chunk.get("metadata", {})
+            text = metadata.get("text", "")
+            if not text or text in seen_texts:
+                continue
+            seen_texts.add(text)
+
+            start, end = metadata.get("start_pos"), metadata.get("end_pos")
+            if start is None or end is None or end - start != len(text):
+                spans.append({"text": text, "rank": rank, "ranks": [rank], "chunks": [chunk]})
+                continue
+
+            by_source.setdefault(metadata.get("source"), []).append(
+                {"text": text, "rank": rank, "ranks": [rank], "chunks": [chunk], "start": start, "end": end}
+            )
+
+        for pieces in by_source.values():
+            pieces.sort(key=lambda piece: piece["start"])
+            current = pieces[0]
+            for piece in pieces[1:]:
+                merged = self._merge(current, piece)
+                if merged is None:
+                    spans.append(current)
+                    current = piece
+                else:
+                    current = merged
+            spans.append(current)
+
+        return spans
+
+    @staticmethod
+    def _merge(first: Dict[str, Any], second: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """first and second as one span when second starts inside or right after first.
+
+        Returns None when they are apart, or when the overlapping text
+        disagrees, which means the positions come from different versions
+        of the source.
+        """
+        if second["start"] > first["end"]:
+            return None
+
+        overlap_end = min(first["end"], second["end"])
+        first_overlap = first["text"][second["start"] - first["start"]:overlap_end - first["start"]]
+        second_overlap = second["text"][:overlap_end - second["start"]]
+        if first_overlap != second_overlap:
+            return None
+
+        text = first["text"]
+        if second["end"] > first["end"]:
+            text += second["text"][first["end"] - second["start"]:]
+        return {
+            "text": text,
+            "rank": min(first["rank"], second["rank"]),
+            "ranks": first["ranks"] + second["ranks"],
+            "chunks": first["chunks"] + second["chunks"],
+            "start": first["start"],
+            "end": max(first["end"], second["end"])
+        }
@@ -1,9 +1,13 @@
-from pymongo import MongoClient
-from app.config import MONGO_URI
+from fastapi import Request, Header, HTTPException
+
+from app.config import ADMIN_API_KEY
 from app.external_services.db import DB
 
-client = MongoClient(MONGO_URI)
-db_instance = DB(client=client)
+def get_db(request: Request) -> DB:
+    return request.app.db
 
-def get_db() -> DB:
-    return db_instance
\ No newline at end of file
+def verify_admin(x_admin_key: str = Header(None)):
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=500, detail="Admin API key is not configured on the server.")
+    if x_admin_key != ADMIN_API_KEY:
+        raise HTTPException(status_code=401, detail="Invalid admin key.")
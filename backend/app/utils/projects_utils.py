@@ -1,10 +1,13 @@
+import codecs
 import hashlib
+import os
 import re
+import unicodedata
 import asyncio
-import functools
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Optional, Dict, Any
+import numpy as np
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Dict, Any
 
+from app.config import INGEST_BATCH_SIZE, INGEST_READ_SIZE
 from app.services.embeddings_service import EmbeddingService
 from app.models.api.rag_pipeline import DocumentEmbedding, DocumentMetadata
 from app.utils.text_chunker import TextChunker
@@ -17,109 +20,192 @@ async def process_batch(batch: List[Dict], stats: Dict, embedding_queue: asyncio
                 await embedding_queue.put(doc)
                 print(f"Chunk {stats['chunks_processed']} queued")
 
+async def drain_batch(embedding_queue: asyncio.Queue, batch_size: int, timeout: float = 1.0) -> List[Dict]:
+    """Wait for one queued document, then take whatever else is ready up to batch_size"""
+    batch = [await asyncio.wait_for(embedding_queue.get(), timeout=timeout)]
+    while len(batch) < batch_size and not embedding_queue.empty():
+        batch.append(embedding_queue.get_nowait())
+    return batch
+
 async def embedding_consumer(
         custom_metadata: Optional[Dict], 
         stats: Dict,
         embedding_queue: asyncio.Queue,
         stop_event: asyncio.Event,
-        executor: ThreadPoolExecutor,
-        embeddings_handler
-):
-    """Consumer that processes embeddings from queue"""
+        scheduler,
+        job_id: str,
+        embeddings_handler,
+        batch_size: int = INGEST_BATCH_SIZE,
+        on_stored: Optional[Callable[[List[Dict]], None]] = None
+) -> List[DocumentEmbedding]:
+    """Consumer that embeds and stores queued documents in batches.
+
+    Encoding happens inside one of the scheduler's slots so concurrent jobs
+    share the embedding budget. Upserts are not awaited server-side; the last
+    stored batch is returned so the caller can use it as a flush barrier.
+    on_stored is called with each batch whose chunks were all stored.
+    """
+    last_stored = []
     while not stop_event.is_set() or not embedding_queue.empty():
         try:
-            doc = await asyncio.wait_for(embedding_queue.get(), timeout=1.0)
-            embedding = await generate_embeddings_batch([doc], custom_metadata, executor)
-
-            if embedding:
-                stats['embeddings_generated'] += 1
-                print(f"Generated embedding {stats['embeddings_generated']}")
-                storage_result = await embeddings_handler.store_embeddings([embedding])
-
-                if storage_result['stored'] == 1:
-                    stats['stored_embeddings'] = stats.get('stored_embeddings', 0) + 1
-                else:
-                    stats['failed_storage'] = stats.get('failed_storage', 0) + 1
-                    print(f"Failed to store embedding {stats['embeddings_generated']}")
-                    
+            batch = await drain_batch(embedding_queue, batch_size)
         except asyncio.TimeoutError:
             continue
+
+        try:
+            async with scheduler.slot(job_id) as encode:
+                embeddings = await generate_embeddings_batch(batch, custom_metadata, encode)
+
+            if not embeddings:
+                stats['failed_embeddings'] += len(batch)
+                continue
+
+            stats['embeddings_generated'] += len(embeddings)
+            print(f"Generated embeddings {stats['embeddings_generated']}")
+            storage_result = await embeddings_handler.store_embeddings(embeddings, wait=False)
+
+            stats['stored_embeddings'] += storage_result['stored']
+            stats['failed_storage'] += storage_result['failed']
+            if storage_result['failed']:
+                print(f"Failed to store {storage_result['failed']} embeddings")
+            if storage_result['stored']:
+                last_stored = embeddings
+            if on_stored and not storage_result['failed'] and len(embeddings) == len(batch):
+                on_stored(batch)
+
         except Exception as e:
-            stats['failed_embeddings'] += 1
+            stats['failed_embeddings'] += len(batch)
             print(f"Embedding failed: {str(e)}")
 
-async def process_text_file(text: str, filename: str) -> List[Dict]:
-    """Process text file into chunks with overlapping context"""
-    
-    chunker = TextChunker(
+    return last_stored
+
+def create_text_chunker() -> TextChunker:
+    return TextChunker(
         chunk_size=1000,  
         overlap=200,
         min_chunk_size=200,
         sentence_aware=True,
         paragraph_aware=True      
     )
-    chunks = chunker.create_chunks(text)
-    
-    result = []
-    for chunk in chunks:
-        result.append({
-            "source": filename,
-            "content_type": "text/plain",
-            "text": chunk['text'],
-            "original_length": len(chunk['text']), 
-            "chunk_number": chunk['index'],
-            "total_chunks": len(chunks),
-            "start_pos": chunk['start_pos'],
-            "end_pos": chunk['end_pos'],
-            "is_sentence_boundary": chunk.get('is_sentence_boundary', False),
-            "is_paragraph_boundary": chunk.get('is_paragraph_boundary', False),
-            "record_type": "text_chunk"
-        })
-
-    return result
+
+def chunk_document(chunk: Dict, filename: str, total_chunks: Optional[int] = None) -> Dict:
+    return {
+        "source": filename,
+        "content_type": "text/plain",
+        "text": chunk['text'],
+        "original_length": len(chunk['text']), 
+        "chunk_number": chunk['index'],
+        "total_chunks": total_chunks,
+        "start_pos": chunk['start_pos'],
+        "end_pos": chunk['end_pos'],
+        "is_sentence_boundary": chunk.get('is_sentence_boundary', False),
+        "is_paragraph_boundary": chunk.get('is_paragraph_boundary', False),
+        "record_type": "text_chunk",
+        **source_info_from_text(chunk['text'])
+    }
+
+async def process_text_file(text: str, filename: str) -> List[Dict]:
+    """Process text file into chunks with overlapping context"""
+    chunks = create_text_chunker().create_chunks(text)
+    return [chunk_document(chunk, filename, len(chunks)) for chunk in chunks]
+
+class ChunkedTextFile:
+    """Chunk documents of a UTF-8 text file, read and chunked incrementally.
+
+    Only one read and the chunker's window are held in memory, so the file
+    size is not bounded by the pod's memory. total_chunks is unknown until
+    the whole file has been read.
+    """
+
+    def __init__(self, path: str, filename: str, read_size: int = INGEST_READ_SIZE):
+        self.path = path
+        self.filename = filename
+        self.read_size = read_size
+        self.bytes_total = os.path.getsize(path)
+        self.bytes_read = 0
+        self.chunks_read = 0
+        self.exhausted = False
+
+    @property
+    def estimated_chunks(self) -> Optional[int]:
+        """Chunk count extrapolated from the share of the file read so far"""
+        if self.exhausted:
+            return self.chunks_read
+        if not self.bytes_read:
+            return None
+        return max(self.chunks_read, round(self.chunks_read * self.bytes_total / self.bytes_read))
+
+    async def __aiter__(self) -> AsyncIterator[Dict]:
+        stream = create_text_chunker().stream()
+        with open(self.path, "rb") as file:
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            while True:
+                data = await asyncio.to_thread(file.read, self.read_size)
+                self.bytes_read += len(data)
+                if data:
+                    chunks = stream.feed(decoder.decode(data))
+                else:
+                    decoder.decode(b"", final=True)
+                    chunks = stream.close()
+
+                for chunk in chunks:
+                    self.chunks_read += 1
+                    yield chunk_document(chunk, self.filename)
+                if not data:
+                    break
+        self.exhausted = True
 
 async def generate_embeddings_batch(
     batch: List[Dict], 
     custom_metadata: Optional[Dict],
-    executor: ThreadPoolExecutor
+    encode: Callable[[List[str]], Awaitable[np.ndarray]]
 ) -> List[DocumentEmbedding]:
-    """Generate embeddings for a single document"""
+    """Generate embeddings for a batch of documents with one encode call"""
     if not batch:
         return None
-    loop = asyncio.get_event_loop()
     try:
-        embedding = await loop.run_in_executor(
-            executor,
-            functools.partial(create_document_embedding, batch[0], custom_metadata)
-        )
-        return embedding
+        vectors = await encode([document['text'] for document in batch])
+        return [
+            create_document_embedding(document, EmbeddingService.to_vector(vector), custom_metadata)
+            for document, vector in zip(batch, vectors)
+        ]
     except Exception as e:
         print(f"Embedding generation error: {str(e)}")
         return None
- 
+
+def chunk_point_id(document: Dict) -> int:
+    """Deterministic point id, so re-ingesting a chunk overwrites it"""
+    text_to_hash = document['text'] + document['source'] + str(document['chunk_number'])
+    return int(hashlib.sha256(text_to_hash.encode()).hexdigest()[:15], 16)
+
+def chunk_content_hash(text: str) -> str:
+    """Hash of the text alone, stable when a chunk only moves within its source"""
+    return hashlib.sha256(text.encode()).hexdigest()
+
 def create_document_embedding(
     document: Dict,
+    embedding_values: List[float],
     custom_metadata: Optional[Dict] = None
 ) -> DocumentEmbedding:
     """Create embedding for a text chunk"""
     try:
-        text_to_hash = document['text'] + document['source'] + str(document['chunk_number'])
-        content_hash = hashlib.sha256(text_to_hash.encode()).hexdigest()
-        int_id = int(content_hash[:15], 16) 
+        int_id = chunk_point_id(document)
 
-        embedding_text = document['text'] 
-        embedding_values = EmbeddingService.create_embeddings(embedding_text)
-        
         metadata = DocumentMetadata(
             source=document['source'],
             content_type=document['content_type'],
             text=document['text'],
             document_id=f"doc_{int_id}",
+            content_hash=chunk_content_hash(document['text']),
             text_length=document.get('original_length', len(document['text'])),
             truncated=False,
             record_type=document['record_type'],
             chunk_number=document['chunk_number'],
             total_chunks=document['total_chunks'],
+            start_pos=document.get('start_pos'),
+            end_pos=document.get('end_pos'),
+            source_name=document.get('source_name'),
+            source_url=document.get('source_url'),
             custom_fields=custom_metadata or {}
         )
 
@@ -143,34 +229,39 @@ def format_context_texts(query_response: List[Dict]) -> List[str]:
            'text' in item['metadata']
     ]
     
+def source_info_from_text(text: str) -> Dict[str, Optional[str]]:
+    """Source attribution embedded in a chunk's text, or None for what it lacks"""
+    source_name = source_url = None
+
+    match = re.search(r'"source_name"\s*:\s*"([^"]+)"', text)
+    if match:
+        source_name = match.group(1).strip()
+
+    match = re.search(r'"source_url"\s*:\s*"([^"]+)"', text)
+    if match:
+        source_url = match.group(1).strip()
+    elif (url_match := re.search(r'(https?://[^\s]+)', text)):
+        source_url = url_match.group(1).strip()
+    elif source_name:
+        normalized = (
+            unicodedata.normalize("NFKD", source_name)
+            .encode("ascii", "ignore")
+            .decode("utf-8")
+        )
+        slug = (
+            re.sub(r"[^\w\s-]", "", normalized)
+            .strip()
+            .lower()
+            .replace(" ", "-")
+        )
+        source_url = f"https://{slug}.com"
+
+    return {"source_name": source_name, "source_url": source_url}
+
 def extract_source_info(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Source attribution is stored at ingest; only points from before that are parsed here"""
     metadata = document.get("metadata", {})
-    text = metadata.get("text", "")
-
-    if "source_name" not in metadata:
-        match = re.search(r'"source_name"\s*:\s*"([^"]+)"', text)
-        if match:
-            metadata["source_name"] = match.group(1).strip()
-
-    if "source_url" not in metadata:
-        match = re.search(r'"source_url"\s*:\s*"([^"]+)"', text)
-        if match:
-            metadata["source_url"] = match.group(1).strip()
-        elif (url_match := re.search(r'(https?://[^\s]+)', text)):
-            metadata["source_url"] = url_match.group(1).strip()
-        elif "source_name" in metadata:
-            normalized = (
-                unicodedata.normalize("NFKD", metadata["source_name"])
-                .encode("ascii", "ignore")
-                .decode("utf-8")
-            )
-            slug = (
-                re.sub(r"[^\w\s-]", "", normalized)
-                .strip()
-                .lower()
-                .replace(" ", "-")
-            )
-            metadata["source_url"] = f"https://{slug}.com"
-
+    if "source_name" not in metadata and "source_url" not in metadata:
+        metadata.update(source_info_from_text(metadata.get("text", "")))
     document["metadata"] = metadata
-    return document
\ No newline at end of file
+    return document
@@ -0,0 +1,87 @@
+import json
+import re
+from typing import Any, List, Tuple
+from fastapi.encoders import jsonable_encoder
+
+def format_sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+class ResponseStreamParser:
+    """Incrementally extracts the bullets of the `response` array from streamed JSON.
+
+    `feed` returns ("bullet_delta", index, text) events as characters of a
+    bullet arrive and a ("bullet", index, text) event once it is complete.
+    """
+    _ARRAY_START = re.compile(r'"response"\s*:\s*\[')
+    _ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.state = "seek"
+        self.current: List[str] = []
+        self.bullets: List[str] = []
+
+    def feed(self, text: str) -> List[Tuple[str, int, str]]:
+        self.buffer += text
+        events = []
+
+        if self.state == "seek":
+            match = self._ARRAY_START.search(self.buffer)
+            if not match:
+                return events
+            self.pos = match.end()
+            self.state = "array"
+
+        delta = []
+        while self.pos < len(self.buffer) and self.state != "done":
+            char = self.buffer[self.pos]
+
+            if self.state == "array":
+                if char == '"':
+                    self.state = "string"
+                elif char == ']':
+                    self.state = "done"
+                self.pos += 1
+                continue
+
+            if char == '\\':
+                # Wait for the rest of the escape sequence before decoding it
+                if self.pos + 1 >= len(self.buffer):
+                    break
+                escape = self.buffer[self.pos + 1]
+                if escape == 'u':
+                    if self.pos + 6 > len(self.buffer):
+                        break
+                    delta.append(chr(int(self.buffer[self.pos + 2:self.pos + 6], 16)))
+                    self.pos += 6
+                else:
+                    delta.append(self._ESCAPES.get(escape, escape))
+                    self.pos += 2
+            elif char == '"':
+                self._flush(delta, events)
+                delta = []
+                bullet = "".join(self.current)
+                bullet = bullet.encode("utf-16", "surrogatepass").decode("utf-16")
+                events.append(("bullet", len(self.bullets), bullet))
+                self.bullets.append(bullet)
+                self.current = []
+                self.state = "array"
+                self.pos += 1
+            else:
+                delta.append(char)
+                self.pos += 1
+
+        self._flush(delta, events)
+        return events
+
+    def _flush(self, delta: List[str], events: List[Tuple[str, int, str]]):
+        if delta:
+            self.current.extend(delta)
+            events.append(("bullet_delta", len(self.bullets), "".join(delta)))
+
+    @property
+    def text(self) -> str:
+        """Everything received so far."""
+        return self.buffer
@@ -17,63 +17,106 @@ class TextChunker:
         self.paragraph_aware = paragraph_aware
         self.sentence_endings = re.compile(r'[.!?]\s+')
         self.paragraph_breaks = re.compile(r'\n\s*\n')
-        
+
     def create_chunks(self, text: str) -> List[Dict]:
         """Split text into chunks with intelligent overlapping and boundary awareness"""
+        stream = self.stream()
+        return stream.feed(text) + stream.close()
+
+    def stream(self) -> 'ChunkStream':
+        """Chunk text that arrives in pieces, holding only the current window"""
+        return ChunkStream(self)
+
+    def _is_sentence_boundary(self, text: str, pos: int) -> bool:
+        """Optimized boundary check"""
+        if pos >= len(text):
+            return True
+        return bool(self.sentence_endings.match(text[pos-1:pos+1]))
+
+    def _is_paragraph_boundary(self, text: str, pos: int) -> bool:
+        """Optimized boundary check"""
+        if pos >= len(text):
+            return True
+        return bool(self.paragraph_breaks.match(text[pos-1:pos+1]))
+
+class ChunkStream:
+    """Incremental TextChunker producing the same chunks as create_chunks.
+
+    A chunk is only cut once the buffer holds its whole boundary search window
+    (chunk_size + overlap past its start), so pieces can split the text
+    anywhere. Text before the next chunk's start is dropped, which carries
+    the overlap across reads and keeps memory bounded by the window size.
+    """
+
+    def __init__(self, chunker: TextChunker):
+        self.chunker = chunker
+        self.buffer = ""
+        self.base = 0  # absolute position of buffer[0]
+        self.start = 0
+        self.index = 0
+
+    def feed(self, text: str) -> List[Dict]:
+        self.buffer += text
+        return self._drain(final=False)
+
+    def close(self) -> List[Dict]:
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> List[Dict]:
+        chunker = self.chunker
+        window = chunker.chunk_size + chunker.overlap + 1
         chunks = []
-        text_length = len(text)
-        start = 0
-        index = 0
-        
-        while start < text_length:
+
+        while True:
+            text_length = self.base + len(self.buffer)
+            if self.start >= text_length or (not final and text_length - self.start < window):
+                break
+
+            # Positions below are relative to the buffer
+            text = self.buffer
+            start = self.start - self.base
+            text_length = len(text)
+
             # Calculate initial end position
-            end = min(start + self.chunk_size, text_length)
+            end = min(start + chunker.chunk_size, text_length)
 
-             # Find boundaries in one pass
-            if self.sentence_aware or self.paragraph_aware:
-                search_start = max(start, end - self.overlap)
-                search_end = min(text_length, end + self.overlap)
+            # Find boundaries in one pass
+            if chunker.sentence_aware or chunker.paragraph_aware:
+                search_start = max(start, end - chunker.overlap)
+                search_end = min(text_length, end + chunker.overlap)
 
                 # Look for both sentence and paragraph boundaries simultaneously
                 best_boundary = end
-                for match in self.sentence_endings.finditer(text, search_start, search_end):
+                for match in chunker.sentence_endings.finditer(text, search_start, search_end):
                     if match.end() <= end:
                         best_boundary = match.end()
-                
-                for match in self.paragraph_breaks.finditer(text, search_start, search_end):
+
+                for match in chunker.paragraph_breaks.finditer(text, search_start, search_end):
                     if match.end() <= end and match.end() > best_boundary:
                         best_boundary = match.end()
-                
+
                 end = best_boundary if best_boundary > start else end
 
             # Skip empty chunks
             if end <= start:
-                start += self.chunk_size - self.overlap
+                self.start += chunker.chunk_size - chunker.overlap
                 continue
-            
+
             chunks.append({
-                'index': index,
+                'index': self.index,
                 'text': text[start:end],
-                'start_pos': start,
-                'end_pos': end,
-                'is_sentence_boundary': self._is_sentence_boundary(text, end),
-                'is_paragraph_boundary': self._is_paragraph_boundary(text, end)
+                'start_pos': self.base + start,
+                'end_pos': self.base + end,
+                # At the end of the buffer only when the whole text has been fed
+                'is_sentence_boundary': chunker._is_sentence_boundary(text, end),
+                'is_paragraph_boundary': chunker._is_paragraph_boundary(text, end)
             })
-            
-            index += 1
+
+            self.index += 1
             # Calculate next start position with overlap
-            start = max(end - self.overlap, start + (self.chunk_size // 2))
-            
+            self.start = self.base + max(end - chunker.overlap, start + (chunker.chunk_size // 2))
+
+        if self.start > self.base:
+            self.buffer = self.buffer[self.start - self.base:]
+            self.base = self.start
         return chunks
-    
-    def _is_sentence_boundary(self, text: str, pos: int) -> bool:
-        """Optimized boundary check"""
-        if pos >= len(text):
-            return True
-        return bool(self.sentence_endings.match(text[pos-1:pos+1]))
-    
-    def _is_paragraph_boundary(self, text: str, pos: int) -> bool:
-        """Optimized boundary check"""
-        if pos >= len(text):
-            return True
-        return bool(self.paragraph_breaks.match(text[pos-1:pos+1]))
\ No newline at end of file
@@ -1,6 +1,13 @@
+import re
 from qdrant_client.http import models
-from typing import List
+from typing import Any, Callable, Dict, List, Optional
 
+from app.constants import (
+    QDRANT_INDEX_PROFILES,
+    RETRIEVAL_STOPWORDS,
+    TEXT_INDEX_MAX_TOKEN_LEN,
+    TEXT_INDEX_MIN_TOKEN_LEN
+)
 from app.models.api.rag_pipeline import DocumentEmbedding
 
 def pad_vector(vector: List[float], target_dimension: int) -> List[float]:
@@ -8,7 +15,81 @@ def pad_vector(vector: List[float], target_dimension: int) -> List[float]:
         return vector[:target_dimension]
     return vector + [0.0] * (target_dimension - len(vector))
 
-def prepare_point(embedding: DocumentEmbedding) -> models.PointStruct:
+def get_index_profile(name: str) -> Dict[str, Any]:
+    if name not in QDRANT_INDEX_PROFILES:
+        raise ValueError(
+            f"Unknown index profile '{name}', expected one of {sorted(QDRANT_INDEX_PROFILES)}"
+        )
+    return QDRANT_INDEX_PROFILES[name]
+
+def hnsw_config_for(profile: Dict[str, Any]) -> models.HnswConfigDiff:
+    return models.HnswConfigDiff(
+        m=profile["m"],
+        ef_construct=profile["ef_construct"],
+        payload_m=16,
+        max_indexing_threads=2
+    )
+
+def quantization_config_for(profile: Dict[str, Any]):
+    """Quantized vectors stay in RAM; originals follow the profile's on_disk setting."""
+    if profile["quantization"] == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True
+            )
+        )
+    if profile["quantization"] == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    return None
+
+def profile_for_collection(config: models.CollectionConfig) -> Optional[str]:
+    """Name of the profile whose index layout the collection config has, if any."""
+    quantization = config.quantization_config
+    if isinstance(quantization, models.ScalarQuantization):
+        quantization = "scalar"
+    elif isinstance(quantization, models.BinaryQuantization):
+        quantization = "binary"
+    elif quantization is not None:
+        return None
+
+    for name, profile in QDRANT_INDEX_PROFILES.items():
+        if (
+            config.hnsw_config.m == profile["m"]
+            and config.hnsw_config.ef_construct == profile["ef_construct"]
+            and quantization == profile["quantization"]
+        ):
+            return name
+    return None
+
+def search_params_for(profile: Dict[str, Any]) -> models.SearchParams:
+    quantization = None
+    if profile["quantization"]:
+        quantization = models.QuantizationSearchParams(
+            rescore=profile["rescore"],
+            oversampling=profile["oversampling"]
+        )
+    return models.SearchParams(hnsw_ef=profile["hnsw_ef"], quantization=quantization)
+
+def keyword_terms(text: str, limit: int) -> List[str]:
+    """Distinct query words the text index can match, longest (usually rarest) first."""
+    terms = []
+    for word in re.findall(r"\w+", text.lower()):
+        if (
+            word not in terms
+            and word not in RETRIEVAL_STOPWORDS
+            and TEXT_INDEX_MIN_TOKEN_LEN <= len(word) <= TEXT_INDEX_MAX_TOKEN_LEN
+        ):
+            terms.append(word)
+    return sorted(terms, key=len, reverse=True)[:limit]
+
+def prepare_point(
+        embedding: DocumentEmbedding,
+        fit_vector: Optional[Callable[[List[float]], List[float]]] = None
+) -> models.PointStruct:
         """Prepare point structure with optimized metadata."""
         if not isinstance(embedding, DocumentEmbedding):
             raise ValueError("Invalid embedding type")
@@ -19,10 +100,15 @@ def prepare_point(embedding: DocumentEmbedding) -> models.PointStruct:
             "source": metadata.get("source"),
             "content_type": metadata.get("content_type"),
             "document_id": metadata.get("document_id"),
+            "content_hash": metadata.get("content_hash"),
             "chunk_number": metadata.get("chunk_number"),
             "total_chunks": metadata.get("total_chunks"),
             "text": metadata.get("text", ""),
-            "text_length": metadata.get("text_length", 0)
+            "text_length": metadata.get("text_length", 0),
+            "start_pos": metadata.get("start_pos"),
+            "end_pos": metadata.get("end_pos"),
+            "source_name": metadata.get("source_name"),
+            "source_url": metadata.get("source_url")
         }
         
         # Add boundary information if available
@@ -33,6 +119,6 @@ def prepare_point(embedding: DocumentEmbedding) -> models.PointStruct:
             
         return models.PointStruct(
             id=embedding.id,
-            vector=embedding.values,
+            vector=fit_vector(embedding.values) if fit_vector else embedding.values,
             payload=optimized_metadata
         )
\ No newline at end of file